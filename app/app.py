@@ -15,9 +15,14 @@ import os
 import sys
 import json
 import time
+import shutil
 from datetime import datetime
 import threading
+import multiprocessing
+import queue
+from concurrent.futures import ThreadPoolExecutor
 import psutil
+import orjson
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -31,6 +36,7 @@ app.config['SECRET_KEY'] = 'your-secret-key-here-change-in-production'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), '..', 'data', 'uploaded')
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif', 'bmp'}
+ALLOWED_SUFFIXES = tuple('.' + ext for ext in app.config['ALLOWED_EXTENSIONS'])
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -39,9 +45,14 @@ MODEL_DIR = os.path.join(BASE_DIR, '..', 'models')
 MODEL_PATH_KERAS = os.path.join(MODEL_DIR, 'image_classifier_model.keras')
 MODEL_PATH_H5 = os.path.join(MODEL_DIR, 'image_classifier_model.h5')
 MODEL_PATH = MODEL_PATH_KERAS if os.path.exists(MODEL_PATH_KERAS) else MODEL_PATH_H5
+# Optional INT8 model produced by scripts/convert_to_tflite.py, used for serving when up to date
+MODEL_PATH_TFLITE = os.path.join(MODEL_DIR, 'image_classifier_model.tflite')
 CLASS_INDICES_PATH = os.path.join(BASE_DIR, '..', 'models', 'class_indices.json')
 TRAIN_DIR = os.path.join(BASE_DIR, '..', 'data', 'train')
-PREDICTION_LOG_PATH = os.path.join(BASE_DIR, '..', 'logs', 'predictions.json')
+PREDICTION_LOG_PATH = os.path.join(BASE_DIR, '..', 'logs', 'predictions.jsonl')
+
+# Number of threads used to save bulk uploads
+UPLOAD_SAVE_WORKERS = 8
 
 # Global variables
 prediction_service = None
@@ -53,6 +64,21 @@ retraining_status = {
     'message': '',
     'last_retrain_time': None
 }
+# Makes checking and claiming is_running one step across request threads
+_retrain_start_lock = threading.Lock()
+
+# System metrics are sampled in a background thread so requests never block on psutil
+METRICS_SAMPLE_INTERVAL = 2  # seconds
+DISK_SAMPLE_INTERVAL = 30  # seconds
+_metrics_cache = {}
+_metrics_thread = None
+_metrics_lock = threading.Lock()
+
+# Prime psutil so the first non-blocking cpu_percent() call has a baseline
+psutil.cpu_percent(interval=None)
+
+# Cached training dataset statistics, keyed on class directory mtimes
+_dataset_stats_cache = {'key': None, 'value': None}
 
 # Ensure directories exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -61,8 +87,40 @@ os.makedirs(os.path.dirname(PREDICTION_LOG_PATH), exist_ok=True)
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+    return filename.lower().endswith(ALLOWED_SUFFIXES)
+
+
+def _fast_save(file_storage, dst_path):
+    """Save an uploaded file, using zero-copy sendfile when it is backed by a real file"""
+    src = file_storage.stream
+    
+    with open(dst_path, 'wb') as out:
+        # Spooled uploads still held in memory would be forced to disk by fileno()
+        if hasattr(os, 'sendfile') and getattr(src, '_rolled', True):
+            try:
+                in_fd = src.fileno()
+                size = os.fstat(in_fd).st_size
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(out.fileno(), in_fd, offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                return
+            except (AttributeError, OSError, ValueError):
+                out.seek(0)
+                out.truncate()
+        
+        src.seek(0)
+        shutil.copyfileobj(src, out, 1 << 20)
+
+
+def get_serving_model_path():
+    """Prefer the quantized TFLite model unless the Keras model is newer (e.g. after retraining)"""
+    if (os.path.exists(MODEL_PATH_TFLITE) and
+            os.path.getmtime(MODEL_PATH_TFLITE) >= os.path.getmtime(MODEL_PATH)):
+        return MODEL_PATH_TFLITE
+    return MODEL_PATH
 
 
 def initialize_model():
@@ -74,10 +132,16 @@ def initialize_model():
         return False
     
     try:
+        previous_service = prediction_service
         prediction_service = PredictionService(
-            model_path=MODEL_PATH,
+            model_path=get_serving_model_path(),
             class_indices_path=CLASS_INDICES_PATH
         )
+        
+        # Release the replaced model's worker threads (and with them the model)
+        if previous_service is not None:
+            previous_service.close()
+        
         model_start_time = datetime.now()
         print("Model initialized successfully!")
         return True
@@ -99,12 +163,65 @@ def get_model_uptime():
     return f"{days}d {hours}h {minutes}m {seconds}s"
 
 
+def orjson_response(payload, status=200):
+    """Build a JSON response serialized with orjson"""
+    return app.response_class(
+        orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+        status=status,
+        mimetype='application/json'
+    )
+
+
+def _sample_system_metrics(disk_percent=None):
+    """Take a non-blocking sample of host resource usage"""
+    if disk_percent is None:
+        disk_percent = psutil.disk_usage('/').percent
+    
+    return {
+        'cpu_percent': psutil.cpu_percent(interval=None),
+        'memory_percent': psutil.virtual_memory().percent,
+        'disk_percent': disk_percent,
+        'sampled_at': time.time()
+    }
+
+
+def _metrics_sampler():
+    """Refresh the cached system metrics in the background"""
+    global _metrics_cache
+    
+    # Disk usage changes slowly, so only re-stat the filesystem every few samples
+    disk_every = max(1, DISK_SAMPLE_INTERVAL // METRICS_SAMPLE_INTERVAL)
+    iteration = 0
+    
+    while True:
+        time.sleep(METRICS_SAMPLE_INTERVAL)
+        iteration += 1
+        
+        if iteration % disk_every == 0:
+            _metrics_cache = _sample_system_metrics()
+        else:
+            _metrics_cache = _sample_system_metrics(_metrics_cache['disk_percent'])
+
+
+def _ensure_metrics_sampler():
+    """Start the metrics sampler thread if it is not running in this process"""
+    global _metrics_cache, _metrics_thread
+    
+    if _metrics_thread is not None and _metrics_thread.is_alive():
+        return
+    
+    with _metrics_lock:
+        if _metrics_thread is None or not _metrics_thread.is_alive():
+            _metrics_cache = _sample_system_metrics()
+            _metrics_thread = threading.Thread(target=_metrics_sampler, daemon=True)
+            _metrics_thread.start()
+
+
 def get_system_metrics():
     """Get system metrics for monitoring"""
+    _ensure_metrics_sampler()
     return {
-        'cpu_percent': psutil.cpu_percent(interval=1),
-        'memory_percent': psutil.virtual_memory().percent,
-        'disk_percent': psutil.disk_usage('/').percent,
+        **_metrics_cache,
         'uptime': get_model_uptime()
     }
 
@@ -133,17 +250,19 @@ def predict():
         
         if file and allowed_file(file.filename):
             try:
+                # Read the upload once and reuse the bytes for prediction and saving
+                data = file.read()
+                
                 # Make prediction
-                result = prediction_service.predict_uploaded_image(file)
+                result = prediction_service.predict_bytes(data, file.filename)
                 
                 # Save to log
                 prediction_service.save_prediction_log(result, PREDICTION_LOG_PATH)
                 
-                # Reset file pointer to save the image
-                file.seek(0)
                 filename = secure_filename(file.filename)
                 filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
+                with open(filepath, 'wb') as f:
+                    f.write(data)
                 
                 return render_template('predict.html', 
                                       result=result,
@@ -171,9 +290,9 @@ def api_predict():
         return jsonify({'error': 'Invalid file'}), 400
     
     try:
-        result = prediction_service.predict_uploaded_image(file)
+        result = prediction_service.predict_uploaded_image(file, batched=True)
         prediction_service.save_prediction_log(result, PREDICTION_LOG_PATH)
-        return jsonify(result)
+        return orjson_response(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -212,18 +331,32 @@ def upload_data():
             flash('No files selected', 'error')
             return redirect(request.url)
         
-        uploaded_count = 0
+        # Save to class-specific folder
+        class_dir = os.path.join(TRAIN_DIR, class_label)
+        # Names that sanitize to the same file keep the last upload, as sequential
+        # saves would, instead of two threads writing one path at once
+        jobs = {}
         for file in files:
             if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                
-                # Save to class-specific folder
-                class_dir = os.path.join(TRAIN_DIR, class_label)
-                os.makedirs(class_dir, exist_ok=True)
-                
-                filepath = os.path.join(class_dir, filename)
-                file.save(filepath)
-                uploaded_count += 1
+                dst_path = os.path.join(class_dir, secure_filename(file.filename))
+                jobs.pop(dst_path, None)
+                jobs[dst_path] = file
+        
+        if jobs:
+            os.makedirs(class_dir, exist_ok=True)
+        
+        def save(job):
+            dst_path, file = job
+            try:
+                _fast_save(file, dst_path)
+                return 1
+            except OSError as e:
+                print(f"Error saving {dst_path}: {str(e)}")
+                return 0
+        
+        # Overlap the disk writes for large batches
+        with ThreadPoolExecutor(max_workers=UPLOAD_SAVE_WORKERS) as executor:
+            uploaded_count = sum(executor.map(save, jobs.items()))
         
         flash(f'Successfully uploaded {uploaded_count} images to class: {class_label}', 'success')
         return redirect(url_for('upload_data'))
@@ -231,8 +364,8 @@ def upload_data():
     # Get available classes
     classes = []
     if os.path.exists(TRAIN_DIR):
-        classes = [d for d in os.listdir(TRAIN_DIR) 
-                  if os.path.isdir(os.path.join(TRAIN_DIR, d))]
+        with os.scandir(TRAIN_DIR) as entries:
+            classes = [entry.name for entry in entries if entry.is_dir()]
     
     return render_template('upload_data.html', classes=classes)
 
@@ -240,15 +373,20 @@ def upload_data():
 @app.route('/retrain', methods=['GET', 'POST'])
 def retrain():
     """Model retraining page"""
-    global retraining_status
-    
     if request.method == 'POST':
-        if retraining_status['is_running']:
-            flash('Retraining already in progress', 'warning')
-            return redirect(url_for('retrain'))
+        with _retrain_start_lock:
+            if retraining_status['is_running']:
+                flash('Retraining already in progress', 'warning')
+                return redirect(url_for('retrain'))
+            
+            _update_retraining_status(
+                is_running=True,
+                progress=0,
+                message='Initializing retraining...'
+            )
         
-        # Start retraining in background thread
-        thread = threading.Thread(target=perform_retraining)
+        # Supervise the retraining process from a background thread
+        thread = threading.Thread(target=supervise_retraining)
         thread.daemon = True
         thread.start()
         
@@ -261,24 +399,80 @@ def retrain():
 @app.route('/api/retrain_status')
 def api_retrain_status():
     """API endpoint to check retraining status"""
-    return jsonify(retraining_status)
+    return orjson_response(retraining_status)
+
+
+def _update_retraining_status(**changes):
+    """Publish a new retraining status snapshot with a single atomic rebind"""
+    global retraining_status
+    retraining_status = {**retraining_status, **changes}
 
 
-def perform_retraining():
-    """Perform model retraining in background"""
-    global retraining_status, prediction_service
+def supervise_retraining():
+    """Run retraining in a separate process, relay its progress and reload the model"""
+    # Spawn rather than fork so the child never inherits TF or serving threads
+    ctx = multiprocessing.get_context('spawn')
+    status_queue = ctx.Queue()
+    process = ctx.Process(target=perform_retraining, args=(status_queue,))
     
     try:
-        retraining_status['is_running'] = True
-        retraining_status['progress'] = 0
-        retraining_status['message'] = 'Initializing retraining...'
+        process.start()
+        
+        while process.is_alive():
+            try:
+                _update_retraining_status(**status_queue.get(timeout=1))
+            except queue.Empty:
+                pass
+        
+        process.join()
         
+        # Apply any updates sent just before the process exited
+        while True:
+            try:
+                _update_retraining_status(**status_queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        if process.exitcode != 0:
+            if not retraining_status['message'].startswith('Error'):
+                _update_retraining_status(
+                    message=f'Error during retraining: process exited with code {process.exitcode}',
+                    progress=0
+                )
+            return
+        
+        _update_retraining_status(progress=90, message='Reloading model...')
+        
+        # Reload prediction service with the new weights
+        initialize_model()
+        
+        _update_retraining_status(
+            progress=100,
+            message='Retraining completed successfully!',
+            last_retrain_time=datetime.now().isoformat()
+        )
+        
+    except Exception as e:
+        _update_retraining_status(
+            message=f'Error during retraining: {str(e)}',
+            progress=0
+        )
+    
+    finally:
+        _update_retraining_status(is_running=False)
+
+
+def perform_retraining(status_queue):
+    """Perform model retraining in a child process, reporting progress through a queue"""
+    def report(**changes):
+        status_queue.put(changes)
+    
+    try:
         # Create preprocessor and classifier
         preprocessor = ImagePreprocessor(img_size=(224, 224))
         classifier = ImageClassifier(img_size=(224, 224), num_classes=2)
         
-        retraining_status['progress'] = 10
-        retraining_status['message'] = 'Loading data...'
+        report(progress=10, message='Loading data...')
         
         # Load training data
         train_generator, val_generator = preprocessor.create_train_generator(
@@ -287,8 +481,7 @@ def perform_retraining():
             validation_split=0.2
         )
         
-        retraining_status['progress'] = 30
-        retraining_status['message'] = 'Retraining model...'
+        report(progress=30, message='Retraining model...')
         
         # Retrain model
         classifier.retrain(
@@ -298,8 +491,7 @@ def perform_retraining():
             epochs=10
         )
         
-        retraining_status['progress'] = 80
-        retraining_status['message'] = 'Saving retrained model...'
+        report(progress=80, message='Saving retrained model...')
         
         # Save retrained model
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -309,22 +501,9 @@ def perform_retraining():
         # Update main model
         classifier.save_model(MODEL_PATH)
         
-        retraining_status['progress'] = 90
-        retraining_status['message'] = 'Reloading model...'
-        
-        # Reload prediction service
-        initialize_model()
-        
-        retraining_status['progress'] = 100
-        retraining_status['message'] = 'Retraining completed successfully!'
-        retraining_status['last_retrain_time'] = datetime.now().isoformat()
-        
     except Exception as e:
-        retraining_status['message'] = f'Error during retraining: {str(e)}'
-        retraining_status['progress'] = 0
-    
-    finally:
-        retraining_status['is_running'] = False
+        report(message=f'Error during retraining: {str(e)}', progress=0)
+        sys.exit(1)
 
 
 @app.route('/monitoring')
@@ -343,6 +522,15 @@ def monitoring():
                          retrain_status=retraining_status)
 
 
+def _dataset_cache_key():
+    """Build a cache key from the modification times of the training directories"""
+    with os.scandir(TRAIN_DIR) as entries:
+        return tuple(sorted(
+            (entry.name, entry.path, entry.stat().st_mtime)
+            for entry in entries if entry.is_dir()
+        ))
+
+
 def get_dataset_statistics():
     """Get statistics about the training dataset"""
     stats = {
@@ -353,14 +541,21 @@ def get_dataset_statistics():
     if not os.path.exists(TRAIN_DIR):
         return stats
     
-    for class_name in os.listdir(TRAIN_DIR):
-        class_path = os.path.join(TRAIN_DIR, class_name)
-        if os.path.isdir(class_path):
-            count = len([f for f in os.listdir(class_path) 
-                        if allowed_file(f)])
-            stats['classes'][class_name] = count
-            stats['total_images'] += count
+    # Adding or removing files bumps the class directory mtime, so an unchanged
+    # key means the cached counts are still valid
+    key = _dataset_cache_key()
+    if key == _dataset_stats_cache['key']:
+        return _dataset_stats_cache['value']
     
+    for class_name, class_path, _ in key:
+        with os.scandir(class_path) as entries:
+            count = sum(1 for entry in entries
+                        if entry.name.lower().endswith(ALLOWED_SUFFIXES) and entry.is_file())
+        stats['classes'][class_name] = count
+        stats['total_images'] += count
+    
+    _dataset_stats_cache['key'] = key
+    _dataset_stats_cache['value'] = stats
     return stats
 
 
@@ -368,7 +563,18 @@ def get_dataset_statistics():
 def api_metrics():
     """API endpoint for system metrics"""
     metrics = get_system_metrics()
-    return jsonify(metrics)
+    
+    # Metrics only change once per sample, so clients can revalidate cheaply
+    etag = f"{metrics['sampled_at']:.6f}"
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = orjson_response(metrics)
+    
+    response.set_etag(etag, weak=True)
+    response.cache_control.public = True
+    response.cache_control.max_age = METRICS_SAMPLE_INTERVAL
+    return response
 
 
 @app.errorhandler(404)
@@ -385,7 +591,9 @@ if __name__ == '__main__':
     # Initialize model on startup
     if initialize_model():
         print("Starting Flask application...")
-        app.run(host='0.0.0.0', port=5000, debug=True)
+        # Development server only; use wsgi.py with gunicorn in production
+        app.run(host='0.0.0.0', port=5000,
+                debug=os.environ.get('FLASK_DEBUG') == '1')
     else:
         print("Failed to initialize model. Please train the model first.")
         print("Run the Jupyter notebook to train the model.")
@@ -0,0 +1,94 @@
+"""
+Convert the Trained Model to INT8 TFLite
+
+This script applies post-training integer quantization to the trained Keras
+model so the web application can serve it with the TFLite interpreter on CPU.
+Training images are used as the representative dataset for calibration.
+
+Usage:
+    python scripts/convert_to_tflite.py
+"""
+
+import os
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.append(str(BASE_DIR / 'src'))
+
+from model import ImageClassifier
+from preprocessing import ImagePreprocessor
+
+MODEL_DIR = BASE_DIR / 'models'
+TRAIN_DIR = BASE_DIR / 'data' / 'train'
+TFLITE_PATH = MODEL_DIR / 'image_classifier_model.tflite'
+
+# Number of training images used to calibrate quantization ranges
+NUM_CALIBRATION_IMAGES = 200
+
+
+def find_model_path():
+    """Locate the trained Keras model"""
+    for name in ('image_classifier_model.keras', 'image_classifier_model.h5'):
+        path = MODEL_DIR / name
+        if path.exists():
+            return path
+    return None
+
+
+def calibration_images(limit=NUM_CALIBRATION_IMAGES):
+    """Yield up to `limit` training image paths, round-robin across classes"""
+    class_files = []
+    for class_dir in sorted(p for p in TRAIN_DIR.iterdir() if p.is_dir()):
+        class_files.append(sorted(str(p) for p in class_dir.iterdir() if p.is_file()))
+
+    count = 0
+    for group in zip(*class_files):
+        for path in group:
+            if count >= limit:
+                return
+            yield path
+            count += 1
+
+
+def convert(model_path):
+    """Quantize the Keras model to INT8 and write the TFLite file"""
+    classifier = ImageClassifier()
+    classifier.load_model(str(model_path))
+
+    img_size = tuple(classifier.model.input_shape[1:3])
+    preprocessor = ImagePreprocessor(img_size=img_size,
+                                     model_includes_rescale=classifier.model_includes_rescale)
+
+    def representative_dataset():
+        for path in calibration_images():
+            try:
+                yield [preprocessor.preprocess_single_image(path).astype('float32')]
+            except ValueError as e:
+                print(f"Skipping {path}: {str(e)}")
+
+    classifier.save_model(str(TFLITE_PATH), save_format='tflite',
+                          representative_data=representative_dataset)
+
+    size_mb = os.path.getsize(TFLITE_PATH) / (1024 * 1024)
+    print(f"✓ INT8 TFLite model saved to: {TFLITE_PATH} ({size_mb:.1f} MB)")
+
+
+if __name__ == "__main__":
+    print("\n" + "="*60)
+    print("INT8 TFLite Conversion")
+    print("="*60)
+
+    model_path = find_model_path()
+    if model_path is None:
+        print("\n⚠️  No trained model found in models/. Train the model first.")
+        sys.exit(1)
+
+    if not TRAIN_DIR.exists():
+        print("\n⚠️  No training data found for calibration in data/train/.")
+        sys.exit(1)
+
+    convert(model_path)
+
+    print("\nRestart the application to serve the quantized model.")
+    print("="*60 + "\n")
@@ -63,20 +63,25 @@ def download_sample_images():
     
     print("\n" + "="*60)
 
+def count_images(dir_path, exts=('.jpg', '.png')):
+    """Count image files in a directory with a single scan"""
+    try:
+        with os.scandir(dir_path) as entries:
+            return sum(1 for entry in entries
+                       if entry.is_file() and entry.name.lower().endswith(exts))
+    except FileNotFoundError:
+        return 0
+
 def check_dataset():
     """Check if dataset is properly organized"""
     print("\n" + "="*60)
     print("Dataset Status Check")
     print("="*60)
     
-    train_cats = len(list((DATA_DIR / 'train' / 'cats').glob('*.jpg'))) + \
-                 len(list((DATA_DIR / 'train' / 'cats').glob('*.png')))
-    train_dogs = len(list((DATA_DIR / 'train' / 'dogs').glob('*.jpg'))) + \
-                 len(list((DATA_DIR / 'train' / 'dogs').glob('*.png')))
-    test_cats = len(list((DATA_DIR / 'test' / 'cats').glob('*.jpg'))) + \
-                len(list((DATA_DIR / 'test' / 'cats').glob('*.png')))
-    test_dogs = len(list((DATA_DIR / 'test' / 'dogs').glob('*.jpg'))) + \
-                len(list((DATA_DIR / 'test' / 'dogs').glob('*.png')))
+    train_cats = count_images(DATA_DIR / 'train' / 'cats')
+    train_dogs = count_images(DATA_DIR / 'train' / 'dogs')
+    test_cats = count_images(DATA_DIR / 'test' / 'cats')
+    test_dogs = count_images(DATA_DIR / 'test' / 'dogs')
     
     print(f"\nTraining Data:")
     print(f"  Cats: {train_cats} images")
@@ -7,10 +7,12 @@ Usage:
     python setup.py
 """
 
+import hashlib
 import os
 import sys
+import shutil
 import subprocess
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 def print_header(text):
     """Print formatted header"""
@@ -51,20 +53,33 @@ def create_directories():
         'logs'
     ]
     
+    # Create each shared ancestor (e.g. data/train) only once
+    seen = set()
     for dir_path in directories:
-        Path(dir_path).mkdir(parents=True, exist_ok=True)
+        prefix = ''
+        for part in dir_path.split('/'):
+            prefix = os.path.join(prefix, part) if prefix else part
+            if prefix in seen:
+                continue
+            seen.add(prefix)
+            try:
+                os.mkdir(prefix)
+            except FileExistsError:
+                pass
         print(f"✓ Created: {dir_path}")
     
     return True
 
+def in_virtual_environment():
+    """Whether pip installs into a virtual environment rather than the system interpreter"""
+    return hasattr(sys, 'real_prefix') or \
+           (hasattr(sys, 'base_prefix') and sys.base_prefix != sys.prefix)
+
 def check_virtual_environment():
     """Check if running in virtual environment"""
     print_step(3, "Checking Virtual Environment")
     
-    in_venv = hasattr(sys, 'real_prefix') or \
-              (hasattr(sys, 'base_prefix') and sys.base_prefix != sys.prefix)
-    
-    if in_venv:
+    if in_virtual_environment():
         print("✓ Running in virtual environment")
         return True
     else:
@@ -82,10 +97,30 @@ def check_virtual_environment():
         response = input("\nContinue anyway? (y/n): ")
         return response.lower() == 'y'
 
+# Kept inside the active virtual environment so each venv tracks its own install
+INSTALL_MARKER = os.path.join(sys.prefix, 'install.sha256')
+
+def requirements_hash():
+    """Hash requirements.txt to detect when dependencies need reinstalling"""
+    with open('requirements.txt', 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
 def install_dependencies():
     """Install Python dependencies"""
     print_step(4, "Installing Dependencies")
     
+    # Only venvs get a marker; never write into a system prefix such as /usr
+    use_marker = in_virtual_environment()
+    requirements_digest = requirements_hash()
+    if use_marker:
+        try:
+            with open(INSTALL_MARKER) as f:
+                if f.read() == requirements_digest:
+                    print("✓ Dependencies already installed (requirements.txt unchanged)")
+                    return True
+        except FileNotFoundError:
+            pass
+    
     print("This may take 5-10 minutes...")
     print("Installing packages from requirements.txt...\n")
     
@@ -97,30 +132,65 @@ def install_dependencies():
             "install", 
             "-r", 
             "requirements.txt",
-            "--upgrade"
+            "--upgrade",
+            "--prefer-binary"
         ])
         print("\n✓ Dependencies installed successfully")
-        return True
     except subprocess.CalledProcessError:
         print("\n❌ Error installing dependencies")
         print("Try installing manually: pip install -r requirements.txt")
         return False
+    
+    # Remember this install so the next run can skip pip entirely
+    if use_marker:
+        try:
+            with open(INSTALL_MARKER, 'w') as f:
+                f.write(requirements_digest)
+        except OSError:
+            pass
+    return True
 
-def check_dataset():
+IMAGE_EXTENSIONS = frozenset({'jpg', 'png'})
+
+# Counting stops here; beyond it the dataset is "good" and exact numbers don't matter
+DATASET_COUNT_LIMIT = 200
+
+def count_images(dir_path, limit=None):
+    """Count image files in a directory with a single scan, stopping at `limit`"""
+    count = 0
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False) and \
+                   entry.name.rpartition('.')[2].lower() in IMAGE_EXTENSIONS:
+                    count += 1
+                    if limit is not None and count >= limit:
+                        break
+    except FileNotFoundError:
+        pass
+    return count
+
+def count_dataset():
+    """Count training images per class"""
+    return (count_images('data/train/cats', DATASET_COUNT_LIMIT),
+            count_images('data/train/dogs', DATASET_COUNT_LIMIT))
+
+def format_count(count):
+    """Format an image count, marking counts that hit the limit"""
+    return f"{count}+" if count >= DATASET_COUNT_LIMIT else str(count)
+
+def check_dataset(counts=None):
     """Check if dataset exists"""
     print_step(5, "Checking Dataset")
     
-    train_cats = len(list(Path('data/train/cats').glob('*.jpg'))) + \
-                 len(list(Path('data/train/cats').glob('*.png')))
-    train_dogs = len(list(Path('data/train/dogs').glob('*.jpg'))) + \
-                 len(list(Path('data/train/dogs').glob('*.png')))
+    train_cats, train_dogs = counts if counts is not None else count_dataset()
     
     total = train_cats + train_dogs
     
     print(f"Training images found:")
-    print(f"  Cats: {train_cats}")
-    print(f"  Dogs: {train_dogs}")
-    print(f"  Total: {total}")
+    print(f"  Cats: {format_count(train_cats)}")
+    print(f"  Dogs: {format_count(train_dogs)}")
+    print(f"  Total: {total}{'+' if max(train_cats, train_dogs) >= DATASET_COUNT_LIMIT else ''}")
     
     if total == 0:
         print("\n⚠️  No training data found!")
@@ -134,27 +204,34 @@ def check_dataset():
         print("\n✓ Dataset looks good!")
         return True
 
-def check_docker():
+def probe_docker():
+    """Detect Docker and Docker Compose without printing"""
+    # A PATH lookup is enough to tell whether they are installed; no need to exec them
+    docker_installed = shutil.which('docker') is not None
+    compose_installed = docker_installed and shutil.which('docker-compose') is not None
+    return docker_installed, compose_installed
+
+def check_docker(probe=None):
     """Check if Docker is available"""
     print_step(6, "Checking Docker (Optional)")
     
-    try:
-        subprocess.check_output(['docker', '--version'])
-        print("✓ Docker is installed")
-        
-        try:
-            subprocess.check_output(['docker-compose', '--version'])
-            print("✓ Docker Compose is installed")
-            return True
-        except:
-            print("⚠️  Docker Compose not found")
-            print("  Install: pip install docker-compose")
-            return False
-    except:
+    docker_installed, compose_installed = probe if probe is not None else probe_docker()
+    
+    if not docker_installed:
         print("⚠️  Docker not found")
         print("  Docker is optional but recommended for deployment")
         print("  Download from: https://www.docker.com/get-started")
         return False
+    
+    print("✓ Docker is installed")
+    
+    if compose_installed:
+        print("✓ Docker Compose is installed")
+        return True
+    
+    print("⚠️  Docker Compose not found")
+    print("  Install: pip install docker-compose")
+    return False
 
 def print_next_steps():
     """Print next steps"""
@@ -221,36 +298,43 @@ def main():
         print("\n❌ Setup failed: Python version incompatible")
         return
     
-    # Step 2: Create directories
-    if create_directories():
-        steps_passed.append("Directory structure")
-    
-    # Step 3: Check virtual environment
-    if not check_virtual_environment():
-        print("\n❌ Setup cancelled")
-        return
-    steps_passed.append("Virtual environment check")
-    
-    # Step 4: Install dependencies
-    install_response = input("\nInstall dependencies now? (y/n): ")
-    if install_response.lower() == 'y':
-        if install_dependencies():
-            steps_passed.append("Dependencies")
+    # The Docker probe and dataset scan are independent of the interactive
+    # steps, so run them in the background and report the results in order
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        docker_probe = executor.submit(probe_docker)
+        
+        # Step 2: Create directories
+        if create_directories():
+            steps_passed.append("Directory structure")
+        
+        dataset_counts = executor.submit(count_dataset)
+        
+        # Step 3: Check virtual environment
+        if not check_virtual_environment():
+            print("\n❌ Setup cancelled")
+            return
+        steps_passed.append("Virtual environment check")
+        
+        # Step 4: Install dependencies
+        install_response = input("\nInstall dependencies now? (y/n): ")
+        if install_response.lower() == 'y':
+            if install_dependencies():
+                steps_passed.append("Dependencies")
+            else:
+                print("\n⚠️  Continuing despite dependency install failure")
         else:
-            print("\n⚠️  Continuing despite dependency install failure")
-    else:
-        print("Skipping dependency installation")
-        print("Remember to run: pip install -r requirements.txt")
-    
-    # Step 5: Check dataset
-    if check_dataset():
-        steps_passed.append("Dataset check")
-    else:
-        print("⚠️  No dataset found - add data before training")
-    
-    # Step 6: Check Docker
-    if check_docker():
-        steps_passed.append("Docker")
+            print("Skipping dependency installation")
+            print("Remember to run: pip install -r requirements.txt")
+        
+        # Step 5: Check dataset
+        if check_dataset(dataset_counts.result()):
+            steps_passed.append("Dataset check")
+        else:
+            print("⚠️  No dataset found - add data before training")
+        
+        # Step 6: Check Docker
+        if check_docker(docker_probe.result()):
+            steps_passed.append("Docker")
     
     # Print summary
     print_header("Setup Summary")
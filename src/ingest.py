@@ -0,0 +1,73 @@
+"""
+Upload Ingest Helpers for Retraining
+
+This module handles:
+- Lightweight image validation with PIL
+- Copying validated uploads into their class folders
+
+Only PIL is needed here, so ingest stays usable without loading the model stack.
+"""
+
+from PIL import Image
+import os
+import shutil
+from typing import Tuple
+
+
+VALID_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif'}
+
+
+def validate_image_file(image_path: str, strict: bool = False) -> bool:
+    """
+    Validate if a file is a valid image
+    
+    Args:
+        image_path: Path to the image file
+        strict: Whether to parse the whole file instead of only its header
+    
+    Returns:
+        True if valid, False otherwise
+    """
+    # Check extension
+    ext = os.path.splitext(image_path)[1].lower()
+    if ext not in VALID_EXTENSIONS:
+        return False
+    
+    try:
+        # PIL only reads the header until pixels are requested
+        with Image.open(image_path) as img:
+            width, height = img.size
+            if img.format is None or width <= 0 or height <= 0:
+                return False
+            
+            if strict:
+                img.verify()
+        
+        return True
+    
+    except Exception:
+        return False
+
+
+def ingest_one(args: Tuple[str, str, str]) -> int:
+    """
+    Validate one uploaded image and copy it into its class folder
+    
+    Args:
+        args: Tuple of (source path, destination path, file name)
+    
+    Returns:
+        1 if the image was copied, 0 otherwise
+    """
+    src_path, dst_path, filename = args
+    
+    try:
+        # Validate image
+        if validate_image_file(src_path):
+            # Kernel-side copy; training only needs the pixels, not timestamps or modes
+            shutil.copyfile(src_path, dst_path)
+            return 1
+    except Exception as e:
+        print(f"Error processing {filename}: {str(e)}")
+    
+    return 0
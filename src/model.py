@@ -10,14 +10,272 @@ This module handles:
 
 import tensorflow as tf
 from tensorflow import keras
-from tensorflow.keras import layers
+from tensorflow.keras import layers, mixed_precision
 from tensorflow.keras.applications import MobileNetV2
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint, ReduceLROnPlateau
 import numpy as np
+import functools
 import os
-import json
+import orjson
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from datetime import datetime
-from typing import Tuple, Optional
+from enum import Enum
+from typing import Callable, Tuple, Optional
+
+def cpu_share() -> int:
+    """
+    Logical CPUs available to this process when serving with several workers
+    
+    gunicorn reads its default worker count from WEB_CONCURRENCY, so dividing by
+    it keeps per-worker thread pools from oversubscribing the machine.
+    
+    Returns:
+        CPU count divided by the worker count, at least 1
+    """
+    workers = max(1, int(os.getenv('WEB_CONCURRENCY', '1')))
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def configure_threading(intra_threads: Optional[int] = None, inter_threads: int = 2):
+    """
+    Size TensorFlow's CPU thread pools
+    
+    Defaults to one intra-op thread per physical core of this worker's CPU share
+    (approximated as half its logical CPUs; hyperthreads don't speed up
+    conv/matmul kernels), overridable with TF_INTRA. Must run before TensorFlow
+    initializes its runtime; afterwards the settings are fixed and this is a no-op.
+    
+    Args:
+        intra_threads: Threads used within a single op
+        inter_threads: Ops run concurrently
+    """
+    if intra_threads is None:
+        intra_threads = int(os.getenv('TF_INTRA', '0')) or max(1, cpu_share() // 2)
+    
+    # Also cap the OpenMP pool used by oneDNN kernels, unless set explicitly
+    os.environ.setdefault('OMP_NUM_THREADS', str(intra_threads))
+    os.environ.setdefault('TF_NUM_INTEROP_THREADS', str(inter_threads))
+    
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(inter_threads)
+    except RuntimeError:
+        pass
+
+
+def _configure_runtime():
+    """
+    Grow GPU memory on demand and size the CPU thread pools
+    
+    Must run before TensorFlow initializes its runtime; afterwards the settings
+    are fixed and this is a no-op.
+    """
+    try:
+        # Don't grab all GPU memory up front on shared machines
+        for gpu in tf.config.list_physical_devices('GPU'):
+            tf.config.experimental.set_memory_growth(gpu, True)
+    except RuntimeError:
+        pass
+    
+    # Default intra-op pools use every core, which oversubscribes many-core servers
+    configure_threading()
+
+
+_configure_runtime()
+
+# Use float16 compute on GPUs (Tensor Cores); CPUs gain nothing from it
+MIXED_PRECISION = bool(tf.config.list_physical_devices('GPU'))
+
+# Keras inference pads batches up to one of these sizes, so XLA compiles at most
+# one program per bucket instead of one per batch size the batcher produces
+XLA_BATCH_BUCKETS = (1, 2, 4, 8, 16, 32)
+if MIXED_PRECISION:
+    mixed_precision.set_global_policy('mixed_float16')
+
+
+@functools.lru_cache(maxsize=4)
+def _load_base(img_size: Tuple[int, int], weights: str = 'imagenet') -> keras.Model:
+    """
+    Load a pretrained MobileNetV2 base once per input size
+    
+    Args:
+        img_size: Input image size (height, width)
+        weights: Pretrained weights to load
+        
+    Returns:
+        Shared template model; clone it before training
+    """
+    return MobileNetV2(
+        input_shape=(*img_size, 3),
+        include_top=False,
+        weights=weights
+    )
+
+
+def probs_as_dict(probs: np.ndarray) -> dict:
+    """
+    Convert a probability array into a {class_index: probability} dict
+    
+    Args:
+        probs: 1-D array of class probabilities
+        
+    Returns:
+        Dictionary mapping class index to probability
+    """
+    return dict(enumerate(probs.tolist()))
+
+
+class InferenceBackend(Enum):
+    """
+    Runtime used to execute a loaded model
+    """
+    KERAS = 'keras'
+    TFLITE = 'tflite'
+    SAVED_MODEL = 'saved_model'
+
+
+class AsyncPredictor:
+    """
+    Coalesces concurrent single-image predictions into batched model calls
+    """
+    
+    # Queued by close() to stop the worker thread
+    _STOP = object()
+    
+    def __init__(self,
+                 predict_fn: Callable[[np.ndarray], np.ndarray],
+                 max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0):
+        """
+        Initialize the predictor
+        
+        Args:
+            predict_fn: Function mapping a (N, H, W, 3) batch to (N, C) probabilities,
+                e.g. ImageClassifier.predict_batch
+            max_batch_size: Maximum number of images per model call
+            max_wait_ms: Maximum time to wait for a batch to fill up
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+    
+    def submit(self, img_array: np.ndarray) -> Future:
+        """
+        Queue a preprocessed image for prediction
+        
+        Args:
+            img_array: Preprocessed image array with a batch dimension of 1
+            
+        Returns:
+            Future resolving to the class probabilities for the image
+        """
+        future = Future()
+        
+        with self._lock:
+            if not self._closed:
+                self._ensure_worker()
+                self._queue.put((img_array, future))
+                return future
+        
+        # Callers still holding a closed predictor (e.g. during a model swap) run unbatched
+        try:
+            future.set_result(self.predict_fn(img_array)[0])
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
+    def predict(self, img_array: np.ndarray, timeout: Optional[float] = None) -> Tuple[int, float, np.ndarray]:
+        """
+        Make a prediction on a single image, batched with concurrent callers
+        
+        Args:
+            img_array: Preprocessed image array with a batch dimension of 1
+            timeout: Maximum seconds to wait for the result
+            
+        Returns:
+            Tuple of (predicted_class_index, confidence, probabilities_array)
+        """
+        probs = self.submit(img_array).result(timeout=timeout)
+        predicted_class = int(np.argmax(probs))
+        
+        return predicted_class, float(probs[predicted_class]), probs
+    
+    def close(self, timeout: Optional[float] = None):
+        """
+        Stop the worker thread once the requests already queued are answered
+        
+        Args:
+            timeout: Maximum seconds to wait for the worker to finish
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            self._queue.put(self._STOP)
+        
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+    
+    def _ensure_worker(self):
+        """Start the worker thread if it is not running in this process (call with _lock held)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+    
+    def _collect_batch(self) -> Tuple[list, bool]:
+        """
+        Block for one request, then drain more until the batch is full or the wait expires
+        
+        Returns:
+            Tuple of (collected requests, whether close() was requested)
+        """
+        item = self._queue.get()
+        if item is self._STOP:
+            return [], True
+        
+        items = [item]
+        deadline = time.monotonic() + self.max_wait
+        
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is self._STOP:
+                return items, True
+            items.append(item)
+        
+        return items, False
+    
+    def _run(self):
+        """Worker loop running one model call per collected batch"""
+        stopping = False
+        while not stopping:
+            items, stopping = self._collect_batch()
+            if not items:
+                continue
+            
+            try:
+                batch = np.concatenate([img_array for img_array, _ in items])
+                predictions = self.predict_fn(batch)
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            
+            for (_, future), probs in zip(items, predictions):
+                future.set_result(probs)
 
 
 class ImageClassifier:
@@ -43,6 +301,14 @@ class ImageClassifier:
         self.model = None
         self.base_model = None
         self.history = None
+        self._compiled = False
+        self._infer_fn = None
+        self.backend = InferenceBackend.KERAS
+        self._interpreter = None
+        # Models built by create_model scale raw [0, 255] pixels in their first layer;
+        # older models take [0, 1] pixels instead
+        self.model_includes_rescale = True
+        self._summary_cache = None
         
     def create_model(self) -> keras.Model:
         """
@@ -51,12 +317,10 @@ class ImageClassifier:
         Returns:
             Compiled Keras model
         """
-        # Load pretrained MobileNetV2
-        self.base_model = MobileNetV2(
-            input_shape=(*self.img_size, 3),
-            include_top=False,
-            weights='imagenet'
-        )
+        # Copy the cached pretrained MobileNetV2 rather than reloading its weights file
+        template = _load_base(tuple(self.img_size))
+        self.base_model = keras.models.clone_model(template)
+        self.base_model.set_weights(template.get_weights())
         
         # Freeze base model initially
         self.base_model.trainable = False
@@ -64,8 +328,8 @@ class ImageClassifier:
         # Build custom architecture
         inputs = keras.Input(shape=(*self.img_size, 3))
         
-        # Preprocessing
-        x = tf.keras.applications.mobilenet_v2.preprocess_input(inputs)
+        # Raw [0, 255] pixels to MobileNetV2's [-1, 1] range, fused into the graph
+        x = layers.Rescaling(1.0 / 127.5, offset=-1.0)(inputs)
         
         # Base model
         x = self.base_model(x, training=False)
@@ -79,15 +343,30 @@ class ImageClassifier:
         x = layers.Dense(128, activation='relu',
                         kernel_regularizer=keras.regularizers.l2(0.01))(x)
         x = layers.Dropout(0.3)(x)
-        outputs = layers.Dense(self.num_classes, activation='softmax')(x)
+        # Keep the softmax in float32 for a numerically stable loss
+        outputs = layers.Dense(self.num_classes, activation='softmax', dtype='float32')(x)
         
         self.model = keras.Model(inputs, outputs)
+        self.backend = InferenceBackend.KERAS
+        self._interpreter = None
+        self._serving_fn = None
+        self._infer_fn = None
+        self.model_includes_rescale = True
+        self._summary_cache = None
         
         # Compile model
         self._compile_model(self.learning_rate)
         
         return self.model
     
+    def _require_keras_backend(self):
+        """
+        Fail clearly when training or evaluating a model loaded for inference only
+        """
+        if self.backend is not InferenceBackend.KERAS:
+            raise ValueError(f"The {self.backend.value} backend is inference-only; "
+                             "load a .keras or .h5 model to train or evaluate it.")
+    
     def _compile_model(self, learning_rate: float):
         """
         Compile the model with optimizer and metrics
@@ -95,13 +374,105 @@ class ImageClassifier:
         Args:
             learning_rate: Learning rate for optimizer
         """
+        optimizer = keras.optimizers.Adam(learning_rate=learning_rate)
+        if MIXED_PRECISION:
+            optimizer = mixed_precision.LossScaleOptimizer(optimizer)
+        
         self.model.compile(
-            optimizer=keras.optimizers.Adam(learning_rate=learning_rate),
+            optimizer=optimizer,
             loss='categorical_crossentropy',
             metrics=['accuracy',
                     keras.metrics.Precision(name='precision'),
                     keras.metrics.Recall(name='recall')]
         )
+        self._compiled = True
+    
+    def _to_tfdata(self, data):
+        """
+        Wrap a Keras data generator in a prefetching tf.data pipeline
+        
+        Args:
+            data: Keras Sequence-style generator, tf.data.Dataset or None
+            
+        Returns:
+            tf.data.Dataset of inputs for the loaded model (None is returned unchanged)
+        """
+        if data is None:
+            return data
+        
+        if isinstance(data, tf.data.Dataset):
+            return self._scale_dataset(data)
+        
+        # Indexing a Sequence doesn't advance it, so the first batch can be inspected
+        x0, y0 = data[0]
+        output_signature = (
+            tf.TensorSpec(shape=(None, *x0.shape[1:]), dtype=x0.dtype),
+            tf.TensorSpec(shape=(None, *y0.shape[1:]), dtype=y0.dtype)
+        )
+        
+        def batches():
+            for i in range(len(data)):
+                yield data[i]
+            # Reshuffle for the next epoch, as Keras would
+            data.on_epoch_end()
+        
+        dataset = tf.data.Dataset.from_generator(batches, output_signature=output_signature)
+        return self._scale_dataset(dataset).prefetch(tf.data.AUTOTUNE)
+    
+    def _scale_dataset(self, dataset: tf.data.Dataset) -> tf.data.Dataset:
+        """
+        Scale raw [0, 255] training images for models without a rescaling layer
+        
+        Args:
+            dataset: tf.data.Dataset of (images, labels) batches
+            
+        Returns:
+            tf.data.Dataset with images in the range the model expects
+        """
+        if self.model_includes_rescale:
+            return dataset
+        
+        # Older models take [0, 1] pixels
+        return dataset.map(lambda x, y: (x / 255.0, y),
+                           num_parallel_calls=tf.data.AUTOTUNE)
+    
+    def build_input_pipeline(self,
+                             file_list: list,
+                             labels: list,
+                             batch_size: int = 32,
+                             shuffle: bool = False) -> tf.data.Dataset:
+        """
+        Build a parallel decode/resize input pipeline from image files
+        
+        Args:
+            file_list: Paths to image files
+            labels: Integer class index for each file
+            batch_size: Batch size
+            shuffle: Whether to shuffle the files each epoch
+            
+        Returns:
+            tf.data.Dataset of (raw [0, 255] images, one-hot labels) batches
+        """
+        def load(path, label):
+            data = tf.io.read_file(path)
+            # libjpeg's fast integer IDCT for JPEGs, generic decoder for the rest
+            image = tf.cond(
+                tf.io.is_jpeg(data),
+                lambda: tf.io.decode_jpeg(data, channels=3, dct_method='INTEGER_FAST'),
+                lambda: tf.io.decode_image(data, channels=3, expand_animations=False)
+            )
+            image.set_shape([None, None, 3])
+            image = tf.image.resize(image, self.img_size)
+            return image, tf.one_hot(label, self.num_classes)
+        
+        dataset = tf.data.Dataset.from_tensor_slices((file_list, labels))
+        if shuffle:
+            dataset = dataset.shuffle(len(file_list), reshuffle_each_iteration=True)
+        
+        return (dataset
+                .map(load, num_parallel_calls=tf.data.AUTOTUNE)
+                .batch(batch_size)
+                .prefetch(tf.data.AUTOTUNE))
     
     def train(self,
              train_generator,
@@ -112,17 +483,21 @@ class ImageClassifier:
         Train the model
         
         Args:
-            train_generator: Training data generator
-            validation_generator: Validation data generator
+            train_generator: Training data generator or tf.data.Dataset
+            validation_generator: Validation data generator or tf.data.Dataset
             epochs: Number of epochs to train
             callbacks: List of Keras callbacks
             
         Returns:
             Training history
         """
+        self._require_keras_backend()
         if self.model is None:
             raise ValueError("Model not created. Call create_model() first.")
         
+        if not self._compiled:
+            self._compile_model(self.learning_rate)
+        
         if callbacks is None:
             callbacks = self._get_default_callbacks()
         
@@ -131,8 +506,8 @@ class ImageClassifier:
         print("=" * 60)
         
         self.history = self.model.fit(
-            train_generator,
-            validation_data=validation_generator,
+            self._to_tfdata(train_generator),
+            validation_data=self._to_tfdata(validation_generator),
             epochs=epochs,
             callbacks=callbacks,
             verbose=1
@@ -151,8 +526,8 @@ class ImageClassifier:
         Fine-tune the model by unfreezing base layers
         
         Args:
-            train_generator: Training data generator
-            validation_generator: Validation data generator
+            train_generator: Training data generator or tf.data.Dataset
+            validation_generator: Validation data generator or tf.data.Dataset
             epochs: Number of epochs to fine-tune
             unfreeze_from: Layer index to start unfreezing from
             callbacks: List of Keras callbacks
@@ -160,6 +535,7 @@ class ImageClassifier:
         Returns:
             Fine-tuning history
         """
+        self._require_keras_backend()
         if self.model is None or self.base_model is None:
             raise ValueError("Model not trained. Train the model first.")
         
@@ -174,6 +550,9 @@ class ImageClassifier:
         for layer in self.base_model.layers[:unfreeze_from]:
             layer.trainable = False
         
+        # Trainable parameter counts changed
+        self._summary_cache = None
+        
         # Recompile with lower learning rate
         self._compile_model(self.learning_rate / 10)
         
@@ -183,8 +562,8 @@ class ImageClassifier:
             callbacks = self._get_default_callbacks()
         
         history_fine = self.model.fit(
-            train_generator,
-            validation_data=validation_generator,
+            self._to_tfdata(train_generator),
+            validation_data=self._to_tfdata(validation_generator),
             epochs=epochs,
             callbacks=callbacks,
             verbose=1
@@ -203,8 +582,8 @@ class ImageClassifier:
         Retrain the model using a pretrained model as starting point
         
         Args:
-            train_generator: Training data generator with new data
-            validation_generator: Validation data generator
+            train_generator: Training data generator or tf.data.Dataset with new data
+            validation_generator: Validation data generator or tf.data.Dataset
             pretrained_model_path: Path to pretrained model file
             epochs: Number of epochs to retrain
             callbacks: List of Keras callbacks
@@ -218,6 +597,7 @@ class ImageClassifier:
         
         # Load pretrained model
         self.load_model(pretrained_model_path)
+        self._require_keras_backend()
         
         # Unfreeze all layers for retraining
         for layer in self.model.layers:
@@ -229,11 +609,12 @@ class ImageClassifier:
         if callbacks is None:
             callbacks = self._get_default_callbacks()
         
-        print(f"Retraining on {train_generator.samples} samples...")
+        if hasattr(train_generator, 'samples'):
+            print(f"Retraining on {train_generator.samples} samples...")
         
         self.history = self.model.fit(
-            train_generator,
-            validation_data=validation_generator,
+            self._to_tfdata(train_generator),
+            validation_data=self._to_tfdata(validation_generator),
             epochs=epochs,
             callbacks=callbacks,
             verbose=1
@@ -288,6 +669,7 @@ class ImageClassifier:
         Returns:
             Dictionary of evaluation metrics
         """
+        self._require_keras_backend()
         if self.model is None:
             raise ValueError("Model not created or loaded.")
         
@@ -295,22 +677,26 @@ class ImageClassifier:
         print("Evaluating Model...")
         print("=" * 60)
         
-        results = self.model.evaluate(test_generator, verbose=1)
+        if not self._compiled:
+            self._compile_model(self.learning_rate)
+        
+        results = self.model.evaluate(self._to_tfdata(test_generator), verbose=1)
+        
+        # Branchless F1 that also works element-wise for per-class precision/recall
+        precision = np.asarray(results[2], dtype=np.float64)
+        recall = np.asarray(results[3], dtype=np.float64)
+        denom = precision + recall
+        f1_score = np.divide(2 * precision * recall, denom,
+                             out=np.zeros_like(denom), where=denom > 0)
         
         metrics = {
             'loss': results[0],
             'accuracy': results[1],
-            'precision': results[2],
-            'recall': results[3]
+            'precision': precision.tolist(),
+            'recall': recall.tolist(),
+            'f1_score': f1_score.tolist()
         }
         
-        # Calculate F1 score
-        if metrics['precision'] + metrics['recall'] > 0:
-            metrics['f1_score'] = 2 * (metrics['precision'] * metrics['recall']) / \
-                                 (metrics['precision'] + metrics['recall'])
-        else:
-            metrics['f1_score'] = 0.0
-        
         print("\n" + "=" * 60)
         print("Evaluation Metrics:")
         print("=" * 60)
@@ -319,7 +705,67 @@ class ImageClassifier:
         
         return metrics
     
-    def predict(self, image_array: np.ndarray) -> Tuple[int, float, dict]:
+    def _get_infer_fn(self):
+        """
+        Get the XLA-compiled inference function for the current model
+        
+        Returns:
+            tf.function running the model in inference mode
+        """
+        if self._infer_fn is None:
+            model = self.model
+            # A fixed signature with a free batch dimension traces once; XLA then
+            # compiles once per bucket size that _infer_bucketed feeds it
+            self._infer_fn = tf.function(
+                lambda x: model(x, training=False),
+                input_signature=[tf.TensorSpec([None, *model.input_shape[1:]], tf.float32)],
+                jit_compile=True
+            )
+        return self._infer_fn
+    
+    def _infer_bucketed(self, images_array: np.ndarray) -> np.ndarray:
+        """
+        Run the Keras model on a batch padded up to the nearest XLA bucket size
+        
+        Args:
+            images_array: Batch of preprocessed images
+            
+        Returns:
+            Array of predictions, one row per input image
+        """
+        images = np.asarray(images_array, dtype=np.float32)
+        if len(images) == 0:
+            return np.empty((0, self.model.output_shape[-1]), dtype=np.float32)
+        
+        infer = self._get_infer_fn()
+        largest = XLA_BATCH_BUCKETS[-1]
+        outputs = []
+        
+        for start in range(0, len(images), largest):
+            chunk = images[start:start + largest]
+            count = len(chunk)
+            bucket = next(size for size in XLA_BATCH_BUCKETS if size >= count)
+            if bucket > count:
+                # Zero rows only fill the compiled shape; inference mode keeps rows independent
+                padded = np.zeros((bucket, *chunk.shape[1:]), dtype=np.float32)
+                padded[:count] = chunk
+                chunk = padded
+            outputs.append(infer(tf.constant(chunk)).numpy()[:count])
+        
+        return outputs[0] if len(outputs) == 1 else np.concatenate(outputs)
+    
+    def warmup(self):
+        """
+        Run dummy batches so every XLA bucket is compiled before real traffic
+        """
+        if self.backend is not InferenceBackend.KERAS:
+            self.predict_batch(np.zeros((1, *self.input_shape), dtype=np.float32))
+            return
+        
+        for size in XLA_BATCH_BUCKETS:
+            self._infer_bucketed(np.zeros((size, *self.input_shape), dtype=np.float32))
+    
+    def predict(self, image_array: np.ndarray) -> Tuple[int, float, np.ndarray]:
         """
         Make prediction on a single image
         
@@ -327,18 +773,22 @@ class ImageClassifier:
             image_array: Preprocessed image array
             
         Returns:
-            Tuple of (predicted_class_index, confidence, all_probabilities)
+            Tuple of (predicted_class_index, confidence, probabilities_array)
         """
-        if self.model is None:
+        if self.backend is InferenceBackend.TFLITE:
+            predictions = self._predict_tflite(image_array)
+        elif self.backend is InferenceBackend.SAVED_MODEL:
+            predictions = self._predict_saved_model(image_array)
+        elif self.model is None:
             raise ValueError("Model not created or loaded.")
+        else:
+            # Direct call through a cached graph avoids model.predict's per-call setup
+            predictions = self._infer_bucketed(image_array)
+        probs = predictions[0]
+        predicted_class = int(np.argmax(probs))
+        confidence = float(probs[predicted_class])
         
-        predictions = self.model.predict(image_array, verbose=0)
-        predicted_class = np.argmax(predictions[0])
-        confidence = float(predictions[0][predicted_class])
-        
-        probabilities = {i: float(prob) for i, prob in enumerate(predictions[0])}
-        
-        return predicted_class, confidence, probabilities
+        return predicted_class, confidence, probs
     
     def predict_batch(self, images_array: np.ndarray) -> np.ndarray:
         """
@@ -350,34 +800,137 @@ class ImageClassifier:
         Returns:
             Array of predictions
         """
+        if self.backend is InferenceBackend.TFLITE:
+            return self._predict_tflite(images_array)
+        
+        if self.backend is InferenceBackend.SAVED_MODEL:
+            return self._predict_saved_model(images_array)
+        
         if self.model is None:
             raise ValueError("Model not created or loaded.")
         
-        return self.model.predict(images_array, verbose=0)
+        # Direct call through the cached graph skips model.predict's per-call loop setup
+        return self._infer_bucketed(images_array)
+    
+    @property
+    def input_shape(self) -> Tuple[int, ...]:
+        """
+        Per-image input shape (height, width, channels) of the loaded model
+        """
+        if self.backend is InferenceBackend.TFLITE:
+            return tuple(int(dim) for dim in self._input_detail['shape'][1:])
+        
+        if self.backend is InferenceBackend.SAVED_MODEL:
+            return (*self.img_size, 3)
+        
+        if self.model is None:
+            raise ValueError("Model not created or loaded.")
+        
+        return tuple(self.model.input_shape[1:])
+    
+    def _predict_saved_model(self, images_array: np.ndarray) -> np.ndarray:
+        """
+        Run the loaded SavedModel serving function on a preprocessed batch
+        
+        Args:
+            images_array: Batch of preprocessed float images
+            
+        Returns:
+            Array of predictions
+        """
+        images = tf.constant(images_array, dtype=tf.float32)
+        return np.asarray(self._serving_fn(images))
+    
+    def _predict_tflite(self, images_array: np.ndarray) -> np.ndarray:
+        """
+        Run the TFLite interpreter on a preprocessed batch
+        
+        Args:
+            images_array: Batch of preprocessed float images
+            
+        Returns:
+            Array of predictions
+        """
+        input_index = self._input_detail['index']
+        input_dtype = self._input_detail['dtype']
+        
+        # Quantize the input if the model expects integer tensors
+        scale, zero_point = self._input_detail['quantization']
+        if scale:
+            limits = np.iinfo(input_dtype)
+            images_array = np.clip(np.round(images_array / scale + zero_point),
+                                   limits.min, limits.max).astype(input_dtype)
+        else:
+            images_array = np.asarray(images_array, dtype=input_dtype)
+        
+        # The interpreter is stateful, so calls must not overlap
+        with self._interpreter_lock:
+            if tuple(self._interpreter.get_input_details()[0]['shape']) != images_array.shape:
+                self._interpreter.resize_tensor_input(input_index, images_array.shape)
+                self._interpreter.allocate_tensors()
+            
+            self._interpreter.set_tensor(input_index, images_array)
+            self._interpreter.invoke()
+            output = self._interpreter.get_tensor(self._output_detail['index'])
+        
+        # Dequantize the output if needed
+        scale, zero_point = self._output_detail['quantization']
+        if scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        
+        return output
+    
+    def create_async_predictor(self,
+                               max_batch_size: int = 32,
+                               max_wait_ms: float = 5.0) -> AsyncPredictor:
+        """
+        Create a micro-batching predictor for concurrent single-image requests
+        
+        Args:
+            max_batch_size: Maximum number of images per model call
+            max_wait_ms: Maximum time to wait for a batch to fill up
+            
+        Returns:
+            AsyncPredictor backed by predict_batch
+        """
+        return AsyncPredictor(self.predict_batch, max_batch_size, max_wait_ms)
     
     def save_model(self, 
                    filepath: str,
-                   save_format: str = 'h5',
-                   include_metadata: bool = True):
+                   save_format: Optional[str] = None,
+                   include_metadata: bool = True,
+                   quantize: bool = True,
+                   representative_data: Optional[Callable] = None):
         """
         Save the trained model
         
         Args:
             filepath: Path to save the model
-            save_format: Format to save ('h5' or 'tf')
+            save_format: Format to save ('h5', 'keras', 'tf' or 'tflite'); inferred
+                from the file extension by default, with no extension meaning a
+                SavedModel directory ('tf')
             include_metadata: Whether to save metadata
+            quantize: Whether to quantize a TFLite model
+            representative_data: Generator function yielding [input_batch] lists used to
+                calibrate full INT8 quantization; without it only weights are quantized
         """
         if self.model is None:
             raise ValueError("No model to save.")
         
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
         
-        if save_format == 'h5':
+        if save_format is None:
+            extension = os.path.splitext(filepath)[1].lower()
+            save_format = {'.h5': 'h5', '.keras': 'keras', '.tflite': 'tflite'}.get(extension, 'tf')
+        
+        if save_format in ('h5', 'keras'):
             self.model.save(filepath)
         elif save_format == 'tf':
-            self.model.save(filepath, save_format='tf')
+            self._save_saved_model(filepath)
+        elif save_format == 'tflite':
+            self._save_tflite(filepath, quantize, representative_data)
         else:
-            raise ValueError("save_format must be 'h5' or 'tf'")
+            raise ValueError("save_format must be 'h5', 'keras', 'tf' or 'tflite'")
         
         print(f"Model saved to: {filepath}")
         
@@ -387,18 +940,74 @@ class ImageClassifier:
                 'img_size': self.img_size,
                 'num_classes': self.num_classes,
                 'learning_rate': self.learning_rate,
+                'model_includes_rescale': self.model_includes_rescale,
                 'saved_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             }
             
-            metadata_path = filepath.replace('.h5', '_metadata.json')
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=4)
+            metadata_path = self._metadata_path(filepath)
+            with open(metadata_path, 'wb') as f:
+                f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
             
             print(f"Metadata saved to: {metadata_path}")
     
+    def _save_saved_model(self, filepath: str):
+        """
+        Export the model as a SavedModel directory for graph-level serving
+        
+        Args:
+            filepath: Directory to write the SavedModel to
+        """
+        if hasattr(self.model, 'export'):
+            # Keras 3 only writes SavedModels through export()
+            self.model.export(filepath)
+        else:
+            self.model.save(filepath, save_format='tf')
+    
+    @staticmethod
+    def _metadata_path(filepath: str) -> str:
+        """
+        Metadata lives inside SavedModel directories and beside single-file models
+        
+        The full file name is kept, so model.keras and model.tflite each get
+        their own metadata file.
+        
+        Args:
+            filepath: Path of the saved model
+            
+        Returns:
+            Path of the metadata JSON file
+        """
+        if os.path.isdir(filepath):
+            return os.path.join(filepath, 'metadata.json')
+        return filepath + '.metadata.json'
+    
+    def _save_tflite(self,
+                     filepath: str,
+                     quantize: bool,
+                     representative_data: Optional[Callable]):
+        """
+        Convert the model to TFLite, optionally with INT8 quantization
+        
+        Args:
+            filepath: Path to save the .tflite file
+            quantize: Whether to quantize the model
+            representative_data: Calibration data generator for full INT8 quantization
+        """
+        converter = tf.lite.TFLiteConverter.from_keras_model(self.model)
+        
+        if quantize:
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            if representative_data is not None:
+                converter.representative_dataset = representative_data
+                converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+                converter.inference_input_type = tf.uint8
+        
+        with open(filepath, 'wb') as f:
+            f.write(converter.convert())
+    
     def load_model(self, filepath: str):
         """
-        Load a trained model (supports both .h5 and .keras formats)
+        Load a trained model (supports .h5, .keras, .tflite and SavedModel directories)
         
         Args:
             filepath: Path to the model file
@@ -407,34 +1016,108 @@ class ImageClassifier:
             raise FileNotFoundError(f"Model file not found: {filepath}")
         
         try:
-            # For .h5 files with Keras 3, use safe_mode=False
-            if filepath.endswith('.h5'):
-                self.model = keras.models.load_model(filepath, safe_mode=False, compile=False)
+            if filepath.endswith('.tflite'):
+                self._load_tflite(filepath)
+            elif os.path.isdir(filepath):
+                self._load_saved_model(filepath)
             else:
-                self.model = keras.models.load_model(filepath, compile=False)
+                # For .h5 files with Keras 3, use safe_mode=False
+                if filepath.endswith('.h5'):
+                    self.model = keras.models.load_model(filepath, safe_mode=False, compile=False)
+                else:
+                    self.model = keras.models.load_model(filepath, compile=False)
+                self.backend = InferenceBackend.KERAS
+                self._interpreter = None
+                self._serving_fn = None
             
-            # Recompile the model with current configuration
-            self.model.compile(
-                optimizer=keras.optimizers.Adam(learning_rate=self.learning_rate),
-                loss='categorical_crossentropy',
-                metrics=['accuracy',
-                         keras.metrics.Precision(name='precision'),
-                         keras.metrics.Recall(name='recall')]
-            )
+            # Compile lazily: inference never needs optimizer state or metrics
+            self._compiled = False
+            self._infer_fn = None
+            # Keras graphs say for themselves; TFLite and SavedModel artifacts rely on
+            # metadata, and artifacts without it predate the rescaling layer
+            self.model_includes_rescale = (self.model is not None
+                                           and self._graph_includes_rescale(self.model))
+            self._summary_cache = None
             print(f"Model loaded from: {filepath}")
         except Exception as e:
             print(f"Error loading model: {str(e)}")
             raise
         
-        # Load metadata if available
-        metadata_path = filepath.replace('.h5', '_metadata.json').replace('.keras', '_metadata.json')
-        if os.path.exists(metadata_path):
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
-                self.img_size = tuple(metadata.get('img_size', self.img_size))
-                self.num_classes = metadata.get('num_classes', self.num_classes)
-                self.learning_rate = metadata.get('learning_rate', self.learning_rate)
-            print(f"Metadata loaded from: {metadata_path}")
+        # Load metadata if available, falling back to the older shared
+        # <name>_metadata.json layout
+        candidates = [self._metadata_path(filepath)]
+        if not os.path.isdir(filepath):
+            candidates.append(os.path.splitext(filepath)[0] + '_metadata.json')
+        
+        for metadata_path in candidates:
+            try:
+                with open(metadata_path, 'rb') as f:
+                    metadata = orjson.loads(f.read())
+                break
+            except FileNotFoundError:
+                continue
+        else:
+            return
+        
+        self.img_size = tuple(metadata.get('img_size', self.img_size))
+        self.num_classes = metadata.get('num_classes', self.num_classes)
+        self.learning_rate = metadata.get('learning_rate', self.learning_rate)
+        if self.model is None:
+            self.model_includes_rescale = metadata.get('model_includes_rescale', False)
+        print(f"Metadata loaded from: {metadata_path}")
+    
+    @staticmethod
+    def _graph_includes_rescale(model: keras.Model) -> bool:
+        """
+        Check whether a Keras model scales raw pixels with a leading Rescaling layer
+        
+        Legacy models start with the mobilenet_v2.preprocess_input ops instead
+        and expect [0, 1] pixels.
+        
+        Args:
+            model: Loaded Keras model
+            
+        Returns:
+            True if the first non-input layer is a Rescaling layer
+        """
+        for layer in model.layers:
+            if isinstance(layer, keras.layers.InputLayer):
+                continue
+            return isinstance(layer, layers.Rescaling)
+        return False
+    
+    def _load_tflite(self, filepath: str):
+        """
+        Load a TFLite model and route predictions through its interpreter
+        
+        Args:
+            filepath: Path to the .tflite file
+        """
+        self._interpreter = tf.lite.Interpreter(model_path=filepath,
+                                                num_threads=cpu_share())
+        self._interpreter.allocate_tensors()
+        self._interpreter_lock = threading.Lock()
+        self._input_detail = self._interpreter.get_input_details()[0]
+        self._output_detail = self._interpreter.get_output_details()[0]
+        
+        self.model = None
+        self.backend = InferenceBackend.TFLITE
+    
+    def _load_saved_model(self, filepath: str):
+        """
+        Load a SavedModel directory and route predictions through its serving function
+        
+        Args:
+            filepath: Path to the SavedModel directory
+        """
+        loaded = tf.saved_model.load(filepath)
+        # export() writes a 'serve' endpoint; older tf-format saves are callable directly
+        self._serving_fn = getattr(loaded, 'serve', loaded)
+        self._saved_model = loaded
+        
+        self.model = None
+        self._interpreter = None
+        self.backend = InferenceBackend.SAVED_MODEL
     
     def get_model_summary(self) -> str:
         """
@@ -446,12 +1129,16 @@ class ImageClassifier:
         if self.model is None:
             raise ValueError("Model not created or loaded.")
         
-        from io import StringIO
-        import sys
+        # The summary only changes with the architecture or trainable flags,
+        # which reset the cache, so build it once per model
+        if self._summary_cache is None:
+            from io import StringIO
+            
+            stream = StringIO()
+            self.model.summary(print_fn=lambda x: stream.write(x + '\n'))
+            self._summary_cache = stream.getvalue()
         
-        stream = StringIO()
-        self.model.summary(print_fn=lambda x: stream.write(x + '\n'))
-        return stream.getvalue()
+        return self._summary_cache
 
 
 if __name__ == "__main__":
@@ -9,12 +9,99 @@ This module handles:
 
 import numpy as np
 import json
+import orjson
 import os
-from typing import Dict, List, Tuple
+import hashlib
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
-from model import ImageClassifier
+from model import ImageClassifier, AsyncPredictor, cpu_share
 from preprocessing import ImagePreprocessor
+from preprocessing_fast import rescale_to_batch
+
+
+def format_ts(timestamp_ns: int) -> str:
+    """
+    Format a result's nanosecond timestamp as a local ISO 8601 string
+    
+    Args:
+        timestamp_ns: Nanoseconds since the epoch, as stored in 'timestamp_ns'
+        
+    Returns:
+        ISO 8601 timestamp with microsecond precision
+    """
+    return datetime.fromtimestamp(timestamp_ns / 1e9).isoformat()
+
+
+class PredictionCache:
+    """
+    LRU cache of confident prediction results keyed by image content hash
+    """
+    
+    def __init__(self, maxsize: int = 4096, min_confidence: float = 0.9):
+        """
+        Initialize the cache
+        
+        Args:
+            maxsize: Maximum number of cached results
+            min_confidence: Only results above this confidence are cached
+        """
+        self.maxsize = maxsize
+        self.min_confidence = min_confidence
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(data: bytes) -> bytes:
+        """
+        Hash raw image bytes into a cache key
+        
+        Args:
+            data: Raw image file contents
+            
+        Returns:
+            16-byte BLAKE2b digest
+        """
+        return hashlib.blake2b(data, digest_size=16).digest()
+    
+    def get(self, key: bytes) -> Optional[Dict]:
+        """
+        Look up a cached result
+        
+        Args:
+            key: Cache key from make_key
+            
+        Returns:
+            Copy of the cached result, or None on a miss
+        """
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                return None
+            self._entries.move_to_end(key)
+            return dict(result)
+    
+    def put(self, key: bytes, result: Dict):
+        """
+        Cache a result if it is a confident, successful prediction
+        
+        Args:
+            key: Cache key from make_key
+            result: Prediction result dictionary
+        """
+        if not result.get('success') or result.get('confidence', 0) <= self.min_confidence:
+            return
+        
+        with self._lock:
+            self._entries[key] = dict(result)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
 
 
 class PredictionService:
@@ -39,6 +126,7 @@ class PredictionService:
         # Load model
         self.classifier = ImageClassifier(img_size=img_size)
         self.classifier.load_model(model_path)
+        self.input_shape = self.classifier.input_shape
         
         # Load class indices
         with open(class_indices_path, 'r') as f:
@@ -47,12 +135,139 @@ class PredictionService:
         # Create reverse mapping (index to class name)
         self.index_to_class = {v: k for k, v in self.class_indices.items()}
         
+        # Class names ordered by index, for positional lookups from probability arrays
+        self.class_names = np.array([self.index_to_class[i] for i in range(len(self.index_to_class))])
+        self._class_name_list = self.class_names.tolist()
+        
         # Initialize preprocessor
-        self.preprocessor = ImagePreprocessor(img_size=img_size)
+        # Normalize inputs only for models that don't rescale pixels themselves
+        self.preprocessor = ImagePreprocessor(
+            img_size=img_size,
+            model_includes_rescale=self.classifier.model_includes_rescale
+        )
+        
+        # Batches concurrent requests into a single model call
+        self.batcher = AsyncPredictor(self._predict_probs, max_batch_size=16, max_wait_ms=10)
+        self.batch_timeout = 30.0
+        
+        # Results for recently seen uploads, keyed by image content
+        self.cache = PredictionCache()
+        
+        # Classifications of recently predicted files, keyed by (path, mtime, size)
+        self._path_cache = OrderedDict()
+        self._path_cache_size = 256
+        self._path_cache_lock = threading.Lock()
+        
+        # Overlaps file I/O and decoding across the images of a batch
+        self._pool = ThreadPoolExecutor(max_workers=cpu_share())
+        
+        # Trace the inference graph now so the first request isn't a latency outlier
+        try:
+            self.warmup()
+        except Exception as e:
+            print(f"Warning: model warmup failed: {str(e)}")
         
         print(f"Prediction service initialized!")
         print(f"Classes: {list(self.class_indices.keys())}")
     
+    def close(self):
+        """
+        Stop the batching worker and thread pool so the model can be released
+        
+        Requests still holding this service keep working: work already queued
+        finishes, and later pool users fall back to running inline.
+        """
+        self.batcher.close()
+        self._pool.shutdown(wait=False)
+    
+    def _pool_map(self, fn, items) -> list:
+        """
+        Map over the thread pool, running inline once close() has shut it down
+        
+        Args:
+            fn: Function applied to each item
+            items: Items to process
+            
+        Returns:
+            List of results, in the order of items
+        """
+        try:
+            return list(self._pool.map(fn, items))
+        except RuntimeError:
+            # A model reload closed this service while a request was still using it
+            return list(map(fn, items))
+    
+    def warmup(self):
+        """
+        Run dummy preprocessing and inference so JIT compilation and graph
+        tracing happen before real traffic
+        """
+        # Compiles the Numba rescale kernel, which cache=True can't persist on read-only installs
+        rescale_to_batch(np.zeros((*self.img_size, 3), dtype=np.uint8),
+                         not self.classifier.model_includes_rescale)
+        self.classifier.warmup()
+    
+    def _predict_probs(self, images_array: np.ndarray) -> np.ndarray:
+        """
+        Run the inference backend on a preprocessed batch
+        
+        Args:
+            images_array: Batch of preprocessed images
+            
+        Returns:
+            Array of class probabilities, one row per image
+        """
+        return np.asarray(self.classifier.predict_batch(np.asarray(images_array, dtype=np.float32)))
+    
+    def _classify(self, img_array: np.ndarray, batched: bool = False) -> Tuple[int, float, np.ndarray]:
+        """
+        Classify a single preprocessed image
+        
+        Args:
+            img_array: Preprocessed image array with a batch dimension of 1
+            batched: Whether to share the model call with concurrent requests
+            
+        Returns:
+            Tuple of (predicted_class_index, confidence, probabilities_array)
+        """
+        if batched:
+            probs = self.batcher.submit(img_array).result(timeout=self.batch_timeout)
+        else:
+            probs = self._predict_probs(img_array)[0]
+        
+        predicted_idx = int(np.argmax(probs))
+        
+        return predicted_idx, float(probs[predicted_idx]), probs
+    
+    def _classify_path(self, image_path: str) -> Tuple[int, float, np.ndarray]:
+        """
+        Classify an image file, reusing the result while the file is unchanged
+        
+        Args:
+            image_path: Path to image file
+            
+        Returns:
+            Tuple of (predicted_class_index, confidence, probabilities_array)
+        """
+        stat = os.stat(image_path)
+        key = (image_path, stat.st_mtime_ns, stat.st_size)
+        
+        with self._path_cache_lock:
+            cached = self._path_cache.get(key)
+            if cached is not None:
+                self._path_cache.move_to_end(key)
+                return cached
+        
+        img_array = self.preprocessor.preprocess_single_image(image_path)
+        classification = self._classify(img_array)
+        
+        with self._path_cache_lock:
+            self._path_cache[key] = classification
+            if len(self._path_cache) > self._path_cache_size:
+                self._path_cache.popitem(last=False)
+        
+        return classification
+    
     def predict_image(self, image_path: str) -> Dict:
         """
         Predict class for a single image file
@@ -64,24 +279,18 @@ class PredictionService:
             Dictionary containing prediction results
         """
         try:
-            # Preprocess image
-            img_array = self.preprocessor.preprocess_single_image(image_path)
-            
-            # Make prediction
-            predicted_idx, confidence, probabilities = self.classifier.predict(img_array)
+            # Preprocess and predict, or reuse the result for an unchanged file
+            predicted_idx, confidence, probabilities = self._classify_path(image_path)
             
             # Format results
             result = {
                 'success': True,
-                'predicted_class': self.index_to_class[predicted_idx],
+                'predicted_class': self._class_name_list[predicted_idx],
                 'predicted_index': int(predicted_idx),
                 'confidence': float(confidence),
-                'probabilities': {
-                    self.index_to_class[idx]: float(prob)
-                    for idx, prob in probabilities.items()
-                },
+                'probabilities': dict(zip(self._class_name_list, probabilities.tolist())),
                 'image_path': image_path,
-                'timestamp': datetime.now().isoformat()
+                'timestamp_ns': time.time_ns()
             }
             
             return result
@@ -91,48 +300,84 @@ class PredictionService:
                 'success': False,
                 'error': str(e),
                 'image_path': image_path,
-                'timestamp': datetime.now().isoformat()
+                'timestamp_ns': time.time_ns()
             }
     
-    def predict_uploaded_image(self, image_file) -> Dict:
+    def predict_uploaded_image(self, image_file, batched: bool = False) -> Dict:
         """
         Predict class for an uploaded image file
         
         Args:
             image_file: Uploaded file object (e.g., from Flask request)
+            batched: Whether to share the model call with concurrent requests
+            
+        Returns:
+            Dictionary containing prediction results
+        """
+        filename = getattr(image_file, 'filename', 'unknown')
+        
+        try:
+            data = image_file.read()
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'filename': filename,
+                'timestamp_ns': time.time_ns()
+            }
+        
+        return self.predict_bytes(data, filename, batched)
+    
+    def predict_bytes(self,
+                      data: bytes,
+                      filename: str = 'unknown',
+                      batched: bool = False) -> Dict:
+        """
+        Predict class for an in-memory encoded image
+        
+        Args:
+            data: Raw image file contents
+            filename: Name reported in the result
+            batched: Whether to share the model call with concurrent requests
             
         Returns:
             Dictionary containing prediction results
         """
         try:
+            # Byte-identical images reuse a previous confident prediction
+            key = PredictionCache.make_key(data)
+            cached = self.cache.get(key)
+            if cached is not None:
+                cached['filename'] = filename
+                cached['timestamp_ns'] = time.time_ns()
+                return cached
+            
             # Preprocess uploaded image
-            img_array = self.preprocessor.preprocess_uploaded_image(image_file)
+            img_array = self.preprocessor.preprocess_uploaded_image(data, digest=key)
             
             # Make prediction
-            predicted_idx, confidence, probabilities = self.classifier.predict(img_array)
+            predicted_idx, confidence, probabilities = self._classify(img_array, batched)
             
             # Format results
             result = {
                 'success': True,
-                'predicted_class': self.index_to_class[predicted_idx],
+                'predicted_class': self._class_name_list[predicted_idx],
                 'predicted_index': int(predicted_idx),
                 'confidence': float(confidence),
-                'probabilities': {
-                    self.index_to_class[idx]: float(prob)
-                    for idx, prob in probabilities.items()
-                },
-                'filename': getattr(image_file, 'filename', 'unknown'),
-                'timestamp': datetime.now().isoformat()
+                'probabilities': dict(zip(self._class_name_list, probabilities.tolist())),
+                'filename': filename,
+                'timestamp_ns': time.time_ns()
             }
             
+            self.cache.put(key, result)
             return result
             
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e),
-                'filename': getattr(image_file, 'filename', 'unknown'),
-                'timestamp': datetime.now().isoformat()
+                'filename': filename,
+                'timestamp_ns': time.time_ns()
             }
     
     def predict_batch(self, image_paths: List[str]) -> List[Dict]:
@@ -145,11 +390,120 @@ class PredictionService:
         Returns:
             List of prediction result dictionaries
         """
+        if all(isinstance(path, str) for path in image_paths):
+            return self.predict_batch_fast(image_paths)
+        
+        # Inference backends are thread-safe (TFLite calls are serialized internally)
+        return self._pool_map(self.predict_image, image_paths)
+    
+    def predict_batch_fast(self,
+                           image_paths: List[str],
+                           chunk_size: int = 32) -> List[Dict]:
+        """
+        Predict classes for multiple images with one model call per chunk
+        
+        A producer thread decodes the next chunk while the current one runs
+        through the model, so decoding and inference overlap.
+        
+        Args:
+            image_paths: List of paths to image files
+            chunk_size: Number of images per model call
+            
+        Returns:
+            List of prediction result dictionaries, in the order of image_paths
+        """
+        # Two chunks in flight: one being decoded, one waiting for the model
+        chunks = queue.Queue(maxsize=2)
+        
+        def produce():
+            try:
+                for start in range(0, len(image_paths), chunk_size):
+                    chunk_paths = image_paths[start:start + chunk_size]
+                    try:
+                        # Decodes straight into one preallocated batch per chunk
+                        try:
+                            batch, errors = self.preprocessor.preprocess_batch_with_errors(
+                                chunk_paths, executor=self._pool)
+                        except RuntimeError:
+                            # close() shut the pool down mid-request; decode inline instead
+                            batch, errors = self.preprocessor.preprocess_batch_with_errors(
+                                chunk_paths)
+                    except Exception as e:
+                        # Report the failure per path so every input still gets a result
+                        batch = np.empty((0, *self.input_shape), dtype=np.float32)
+                        errors = [e] * len(chunk_paths)
+                    chunks.put((chunk_paths, batch, errors))
+            finally:
+                chunks.put(None)
+        
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        
+        timestamp_ns = time.time_ns()
         results = []
         
-        for image_path in image_paths:
-            result = self.predict_image(image_path)
-            results.append(result)
+        # Inference releases the GIL, so the producer keeps decoding meanwhile
+        while True:
+            item = chunks.get()
+            if item is None:
+                break
+            results.extend(self._predict_loaded(*item, timestamp_ns))
+        
+        producer.join()
+        return results
+    
+    def _predict_loaded(self,
+                        image_paths: List[str],
+                        batch: np.ndarray,
+                        errors: list,
+                        timestamp_ns: int) -> List[Dict]:
+        """
+        Classify a chunk of preprocessed images with a single model call
+        
+        Args:
+            image_paths: Paths of the images in the chunk
+            batch: Preprocessed images that loaded, in path order
+            errors: None or the exception raised while loading, per path
+            timestamp_ns: Timestamp recorded in the results
+            
+        Returns:
+            List of prediction result dictionaries, in the order of image_paths
+        """
+        valid = [i for i, error in enumerate(errors) if error is None]
+        
+        probs = np.empty((0, 0), dtype=np.float32)
+        if valid:
+            try:
+                probs = self._predict_probs(batch)
+            except Exception as e:
+                errors = [e] * len(image_paths)
+                valid = []
+        
+        predicted = probs.argmax(axis=1) if valid else []
+        rows = dict(zip(valid, range(len(valid))))
+        results = []
+        
+        for i, image_path in enumerate(image_paths):
+            if i not in rows:
+                results.append({
+                    'success': False,
+                    'error': str(errors[i]),
+                    'image_path': image_path,
+                    'timestamp_ns': timestamp_ns
+                })
+                continue
+            
+            row = rows[i]
+            predicted_idx = int(predicted[row])
+            results.append({
+                'success': True,
+                'predicted_class': self._class_name_list[predicted_idx],
+                'predicted_index': predicted_idx,
+                'confidence': float(probs[row, predicted_idx]),
+                'probabilities': dict(zip(self._class_name_list, probs[row].tolist())),
+                'image_path': image_path,
+                'timestamp_ns': timestamp_ns
+            })
         
         return results
     
@@ -167,31 +521,29 @@ class PredictionService:
             Dictionary with top-k predictions
         """
         try:
-            # Preprocess image
-            img_array = self.preprocessor.preprocess_single_image(image_path)
+            # Preprocess and predict, or reuse the result for an unchanged file
+            _, _, probabilities = self._classify_path(image_path)
             
-            # Make prediction
-            _, _, probabilities = self.classifier.predict(img_array)
-            
-            # Sort by probability
-            sorted_probs = sorted(probabilities.items(), 
-                                 key=lambda x: x[1], 
-                                 reverse=True)[:k]
+            # Partition out the k largest, then sort only those
+            k = max(0, min(k, len(probabilities)))
+            top_idx = np.argpartition(probabilities, -k)[-k:] if k else np.empty(0, dtype=int)
+            top_idx = top_idx[np.argsort(-probabilities[top_idx])]
             
             # Format results
             top_k = [
                 {
-                    'class': self.index_to_class[idx],
-                    'probability': float(prob)
+                    'class': name,
+                    'probability': prob
                 }
-                for idx, prob in sorted_probs
+                for name, prob in zip(self.class_names[top_idx].tolist(),
+                                      probabilities[top_idx].tolist())
             ]
             
             result = {
                 'success': True,
                 'top_predictions': top_k,
                 'image_path': image_path,
-                'timestamp': datetime.now().isoformat()
+                'timestamp_ns': time.time_ns()
             }
             
             return result
@@ -201,7 +553,7 @@ class PredictionService:
                 'success': False,
                 'error': str(e),
                 'image_path': image_path,
-                'timestamp': datetime.now().isoformat()
+                'timestamp_ns': time.time_ns()
             }
     
     def predict_with_threshold(self, 
@@ -230,28 +582,18 @@ class PredictionService:
     
     def save_prediction_log(self, 
                            prediction_result: Dict, 
-                           log_path: str = 'prediction_log.json'):
+                           log_path: str = 'prediction_log.jsonl'):
         """
-        Save prediction result to a log file
+        Append a prediction result to a JSON Lines log file
         
         Args:
             prediction_result: Prediction result dictionary
             log_path: Path to log file
         """
         try:
-            # Load existing logs
-            if os.path.exists(log_path):
-                with open(log_path, 'r') as f:
-                    logs = json.load(f)
-            else:
-                logs = []
-            
-            # Append new prediction
-            logs.append(prediction_result)
-            
-            # Save updated logs
-            with open(log_path, 'w') as f:
-                json.dump(logs, f, indent=4)
+            # One JSON object per line, so logging never rewrites earlier entries
+            with open(log_path, 'ab') as f:
+                f.write(orjson.dumps(prediction_result, option=orjson.OPT_SERIALIZE_NUMPY) + b'\n')
             
             print(f"Prediction logged to {log_path}")
             
@@ -259,12 +601,12 @@ class PredictionService:
             print(f"Error saving prediction log: {str(e)}")
     
     def get_prediction_statistics(self, 
-                                  log_path: str = 'prediction_log.json') -> Dict:
+                                  log_path: str = 'prediction_log.jsonl') -> Dict:
         """
         Get statistics from prediction logs
         
         Args:
-            log_path: Path to log file
+            log_path: Path to JSON Lines log file
             
         Returns:
             Dictionary with statistics
@@ -273,35 +615,47 @@ class PredictionService:
             if not os.path.exists(log_path):
                 return {'error': 'No prediction logs found'}
             
-            with open(log_path, 'r') as f:
-                logs = json.load(f)
+            total_predictions = 0
+            successful_predictions = 0
             
-            # Calculate statistics
-            total_predictions = len(logs)
-            successful_predictions = sum(1 for log in logs if log.get('success', False))
+            # Class distribution and running confidence aggregates
+            class_counts = Counter()
+            confidence_count = 0
+            confidence_sum = 0.0
+            confidence_min = float('inf')
+            confidence_max = float('-inf')
             
-            # Class distribution
-            class_counts = {}
-            confidences = []
-            
-            for log in logs:
-                if log.get('success', False):
-                    pred_class = log.get('predicted_class')
-                    if pred_class:
-                        class_counts[pred_class] = class_counts.get(pred_class, 0) + 1
+            # Stream the log one entry at a time instead of loading it whole
+            with open(log_path, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    
+                    log = orjson.loads(line)
+                    total_predictions += 1
                     
-                    confidence = log.get('confidence')
-                    if confidence is not None:
-                        confidences.append(confidence)
+                    if log.get('success', False):
+                        successful_predictions += 1
+                        
+                        pred_class = log.get('predicted_class')
+                        if pred_class:
+                            class_counts[pred_class] += 1
+                        
+                        confidence = log.get('confidence')
+                        if confidence is not None:
+                            confidence_count += 1
+                            confidence_sum += confidence
+                            confidence_min = min(confidence_min, confidence)
+                            confidence_max = max(confidence_max, confidence)
             
             stats = {
                 'total_predictions': total_predictions,
                 'successful_predictions': successful_predictions,
                 'failed_predictions': total_predictions - successful_predictions,
-                'class_distribution': class_counts,
-                'average_confidence': np.mean(confidences) if confidences else 0,
-                'min_confidence': np.min(confidences) if confidences else 0,
-                'max_confidence': np.max(confidences) if confidences else 0
+                'class_distribution': dict(class_counts),
+                'average_confidence': confidence_sum / confidence_count if confidence_count else 0,
+                'min_confidence': confidence_min if confidence_count else 0,
+                'max_confidence': confidence_max if confidence_count else 0
             }
             
             return stats
@@ -334,6 +688,7 @@ def predict_from_cli(model_path: str,
     
     if result['success']:
         print(f"\nImage: {result['image_path']}")
+        print(f"Time: {format_ts(result['timestamp_ns'])}")
         print(f"Predicted Class: {result['predicted_class']}")
         print(f"Confidence: {result['confidence']:.2%}")
         print(f"\nAll Probabilities:")
@@ -9,100 +9,128 @@ This module handles:
 
 import numpy as np
 import tensorflow as tf
-from tensorflow.keras.preprocessing.image import ImageDataGenerator, load_img, img_to_array
 from PIL import Image
+import hashlib
+import io
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
 from typing import Tuple, Optional
 
+from ingest import validate_image_file, ingest_one
+from preprocessing_fast import rescale_to_batch
+
 
 class ImagePreprocessor:
     """
     Handles all image preprocessing operations
     """
     
-    def __init__(self, img_size: Tuple[int, int] = (224, 224)):
+    def __init__(self,
+                 img_size: Tuple[int, int] = (224, 224),
+                 model_includes_rescale: bool = False):
         """
         Initialize the preprocessor
         
         Args:
             img_size: Target size for images (height, width)
+            model_includes_rescale: Whether the model rescales raw [0, 255] pixels
+                itself, in which case normalization is skipped here
         """
         self.img_size = img_size
+        self.model_includes_rescale = model_includes_rescale
+        
+        # Recently preprocessed uploads, keyed by a hash of their encoded bytes.
+        # Each entry is a float32 224x224x3 array (~600 KB), so 16 entries cost
+        # about 10 MB per worker process
+        self._prep_cache = OrderedDict()
+        self._prep_cache_size = 16
+        self._prep_cache_lock = threading.Lock()
+        
+    def _build_augmentation(self) -> tf.keras.Sequential:
+        """
+        Create the random augmentation applied to training batches
         
+        Returns:
+            Sequential model of Keras preprocessing layers
+        """
+        return tf.keras.Sequential([
+            tf.keras.layers.RandomRotation(20 / 360, fill_mode='nearest'),
+            tf.keras.layers.RandomTranslation(0.2, 0.2, fill_mode='nearest'),
+            tf.keras.layers.RandomFlip('horizontal'),
+            tf.keras.layers.RandomZoom(0.2, fill_mode='nearest')
+        ])
+    
     def create_train_generator(self, 
                                train_dir: str, 
                                batch_size: int = 32,
-                               validation_split: float = 0.2) -> Tuple:
+                               validation_split: float = 0.2,
+                               cache: bool = False) -> Tuple:
         """
-        Create training and validation data generators with augmentation
+        Create training and validation datasets with augmentation
         
         Args:
             train_dir: Directory containing training images
             batch_size: Batch size for training
             validation_split: Fraction of data to use for validation
+            cache: Whether to keep decoded images in memory after the first epoch
             
         Returns:
-            Tuple of (train_generator, validation_generator)
+            Tuple of (train_dataset, validation_dataset) of (raw [0, 255] images,
+            one-hot labels) batches; the model handles rescaling
         """
-        # Data augmentation for training
-        train_datagen = ImageDataGenerator(
-            rescale=1./255,
-            rotation_range=20,
-            width_shift_range=0.2,
-            height_shift_range=0.2,
-            horizontal_flip=True,
-            zoom_range=0.2,
-            shear_range=0.2,
-            fill_mode='nearest',
-            validation_split=validation_split
-        )
-        
-        # Training generator
-        train_generator = train_datagen.flow_from_directory(
-            train_dir,
-            target_size=self.img_size,
+        # Both subsets must use the same seed so the split doesn't overlap
+        split_options = dict(
+            image_size=self.img_size,
+            # Bilinear, like _decode_resize and the upload prediction path
+            interpolation='bilinear',
             batch_size=batch_size,
-            class_mode='categorical',
-            subset='training',
-            shuffle=True
+            label_mode='categorical',
+            validation_split=validation_split,
+            seed=123
         )
+        train_ds = tf.keras.utils.image_dataset_from_directory(
+            train_dir, subset='training', **split_options)
+        validation_ds = tf.keras.utils.image_dataset_from_directory(
+            train_dir, subset='validation', **split_options)
         
-        # Validation generator
-        validation_generator = train_datagen.flow_from_directory(
-            train_dir,
-            target_size=self.img_size,
-            batch_size=batch_size,
-            class_mode='categorical',
-            subset='validation',
-            shuffle=False
-        )
+        # Data augmentation for training runs as parallel TF ops
+        augmentation = self._build_augmentation()
+        
+        if cache:
+            train_ds = train_ds.cache()
+            validation_ds = validation_ds.cache()
+        
+        train_ds = train_ds.map(lambda x, y: (augmentation(x, training=True), y),
+                                num_parallel_calls=tf.data.AUTOTUNE)
         
-        return train_generator, validation_generator
+        return (train_ds.prefetch(tf.data.AUTOTUNE),
+                validation_ds.prefetch(tf.data.AUTOTUNE))
     
     def create_test_generator(self, 
                              test_dir: str, 
                              batch_size: int = 32):
         """
-        Create test data generator without augmentation
+        Create test dataset without augmentation
         
         Args:
             test_dir: Directory containing test images
             batch_size: Batch size for testing
             
         Returns:
-            Test data generator
+            Test dataset of (raw [0, 255] images, one-hot labels) batches
         """
-        test_datagen = ImageDataGenerator(rescale=1./255)
-        
-        test_generator = test_datagen.flow_from_directory(
+        test_ds = tf.keras.utils.image_dataset_from_directory(
             test_dir,
-            target_size=self.img_size,
+            image_size=self.img_size,
+            interpolation='bilinear',
             batch_size=batch_size,
-            class_mode='categorical',
+            label_mode='categorical',
             shuffle=False
         )
         
-        return test_generator
+        return test_ds.prefetch(tf.data.AUTOTUNE)
     
     def preprocess_single_image(self, 
                                image_path: str,
@@ -112,63 +140,91 @@ class ImagePreprocessor:
         
         Args:
             image_path: Path to the image file
-            normalize: Whether to normalize pixel values
+            normalize: Whether to normalize pixel values (skipped when the model
+                includes rescaling)
             
         Returns:
             Preprocessed image array ready for prediction
         """
+        normalize = normalize and not self.model_includes_rescale
+        
         try:
-            # Load image
-            img = load_img(image_path, target_size=self.img_size)
-            
-            # Convert to array
-            img_array = img_to_array(img)
-            
-            # Normalize if requested
-            if normalize:
-                img_array = img_array / 255.0
-            
-            # Add batch dimension
-            img_array = np.expand_dims(img_array, axis=0)
-            
-            return img_array
+            # Rescale and add batch dimension in a single fused pass
+            return rescale_to_batch(self._decode_resize(image_path), normalize)
             
         except Exception as e:
             raise ValueError(f"Error preprocessing image {image_path}: {str(e)}")
     
+    def _decode_resize(self, image_path: str) -> np.ndarray:
+        """
+        Decode an image file into resized uint8 pixels
+        
+        Args:
+            image_path: Path to the image file
+            
+        Returns:
+            HxWx3 uint8 array
+        """
+        # Decode with PIL, as load_img does, but keep the pixels as uint8
+        with Image.open(image_path) as img:
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            # Bilinear, matching uploads and the training datasets; PIL takes (width, height)
+            img = img.resize(self.img_size[::-1], Image.BILINEAR)
+            
+            return np.asarray(img, dtype=np.uint8)
+    
     def preprocess_uploaded_image(self, 
                                  image_file,
-                                 normalize: bool = True) -> np.ndarray:
+                                 normalize: bool = True,
+                                 digest: Optional[bytes] = None) -> np.ndarray:
         """
         Preprocess an uploaded image file (e.g., from Flask request)
         
         Args:
             image_file: File object or bytes
-            normalize: Whether to normalize pixel values
+            normalize: Whether to normalize pixel values (skipped when the model
+                includes rescaling)
+            digest: BLAKE2b digest of the bytes, if the caller already has one
             
         Returns:
-            Preprocessed image array ready for prediction
+            Preprocessed image array ready for prediction (shared with the
+            cache, so it is read-only)
         """
+        normalize = normalize and not self.model_includes_rescale
+        
         try:
-            # Load image from file object
-            img = Image.open(image_file)
+            # Read the encoded bytes once; identical uploads skip decoding
+            data = bytes(image_file) if isinstance(image_file, (bytes, bytearray, memoryview)) \
+                else image_file.read()
+            if digest is None:
+                digest = hashlib.blake2b(data, digest_size=16).digest()
+            key = (digest, normalize)
             
-            # Convert to RGB if necessary
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
+            with self._prep_cache_lock:
+                cached = self._prep_cache.get(key)
+                if cached is not None:
+                    self._prep_cache.move_to_end(key)
+                    return cached
             
-            # Resize
-            img = img.resize(self.img_size)
+            # PIL takes sizes as (width, height)
+            target_size = self.img_size[::-1]
             
-            # Convert to array
-            img_array = img_to_array(img)
+            with Image.open(io.BytesIO(data)) as img:
+                # Let libjpeg decode large JPEGs at a reduced scale (no-op for other formats)
+                img.draft('RGB', target_size)
+                
+                # Convert and resize without keeping the full-resolution RGB copy around
+                img = img.convert('RGB').resize(target_size, Image.BILINEAR)
             
-            # Normalize if requested
-            if normalize:
-                img_array = img_array / 255.0
+            # Rescale and add batch dimension in a single fused pass
+            img_array = rescale_to_batch(np.asarray(img, dtype=np.uint8), normalize)
+            img_array.setflags(write=False)
             
-            # Add batch dimension
-            img_array = np.expand_dims(img_array, axis=0)
+            with self._prep_cache_lock:
+                self._prep_cache[key] = img_array
+                if len(self._prep_cache) > self._prep_cache_size:
+                    self._prep_cache.popitem(last=False)
             
             return img_array
             
@@ -177,31 +233,118 @@ class ImagePreprocessor:
     
     def preprocess_batch_images(self, 
                                image_paths: list,
-                               normalize: bool = True) -> np.ndarray:
+                               normalize: bool = True,
+                               executor: Optional[Executor] = None) -> np.ndarray:
         """
         Preprocess a batch of images
         
         Args:
             image_paths: List of paths to image files
-            normalize: Whether to normalize pixel values
+            normalize: Whether to normalize pixel values (skipped when the model
+                includes rescaling)
+            executor: Optional executor used to decode images concurrently
             
         Returns:
             Batch of preprocessed images
         """
-        images = []
+        batch, errors = self.preprocess_batch_with_errors(image_paths, normalize, executor)
         
-        for image_path in image_paths:
+        for image_path, error in zip(image_paths, errors):
+            if error is not None:
+                print(f"Skipping {image_path}: {str(error)}")
+        
+        if len(batch) == 0:
+            raise ValueError("No valid images found in the batch")
+        
+        return batch
+    
+    def preprocess_batch_with_errors(self,
+                                     image_paths: list,
+                                     normalize: bool = True,
+                                     executor: Optional[Executor] = None) -> Tuple[np.ndarray, list]:
+        """
+        Preprocess a batch of images, reporting which files could not be loaded
+        
+        Args:
+            image_paths: List of paths to image files
+            normalize: Whether to normalize pixel values (skipped when the model
+                includes rescaling)
+            executor: Optional executor used to decode images concurrently
+            
+        Returns:
+            Tuple of (batch of the images that loaded, in order, and a list with
+            None or the raised exception for each path)
+        """
+        normalize = normalize and not self.model_includes_rescale
+        
+        def load(image_path):
             try:
-                img_array = self.preprocess_single_image(image_path, normalize)
-                images.append(img_array[0])  # Remove batch dimension
+                return self._decode_resize(image_path)
             except Exception as e:
-                print(f"Skipping {image_path}: {str(e)}")
+                return e
+        
+        # Rescale every image straight into one contiguous NHWC batch
+        batch = np.empty((len(image_paths), *self.img_size, 3), dtype=np.float32)
+        errors = []
+        count = 0
+        
+        loaded = executor.map(load, image_paths) if executor is not None else map(load, image_paths)
+        for pixels in loaded:
+            if isinstance(pixels, Exception):
+                errors.append(pixels)
                 continue
+            rescale_to_batch(pixels, normalize, out=batch[count:count + 1])
+            errors.append(None)
+            count += 1
         
-        if not images:
+        # Leading-axis slice of a C-contiguous array stays contiguous
+        return batch[:count], errors
+    
+    def preprocess_batch_images_tf(self,
+                                   image_paths: list,
+                                   normalize: bool = True) -> np.ndarray:
+        """
+        Preprocess a batch of images with a parallel tf.data pipeline
+        
+        Decoding and resizing run in parallel inside the TensorFlow runtime and the
+        batch is assembled there, so there is no per-image Python work. Unreadable
+        images are skipped, as in preprocess_batch_images.
+        
+        Args:
+            image_paths: List of paths to image files
+            normalize: Whether to normalize pixel values (skipped when the model
+                includes rescaling)
+            
+        Returns:
+            Batch of preprocessed images
+        """
+        normalize = normalize and not self.model_includes_rescale
+        
+        if not image_paths:
             raise ValueError("No valid images found in the batch")
         
-        return np.array(images)
+        scale = 1.0 / 255.0 if normalize else 1.0
+        
+        def decode_resize(path):
+            data = tf.io.read_file(path)
+            image = tf.cond(
+                tf.io.is_jpeg(data),
+                lambda: tf.io.decode_jpeg(data, channels=3),
+                lambda: tf.io.decode_image(data, channels=3, expand_animations=False)
+            )
+            image.set_shape([None, None, 3])
+            return tf.image.resize(tf.cast(image, tf.float32), self.img_size) * scale
+        
+        dataset = (tf.data.Dataset.from_tensor_slices([str(p) for p in image_paths])
+                   .map(decode_resize, num_parallel_calls=tf.data.AUTOTUNE)
+                   .ignore_errors()
+                   .batch(len(image_paths))
+                   .prefetch(tf.data.AUTOTUNE))
+        
+        for batch in dataset:
+            return batch.numpy()
+        
+        raise ValueError("No valid images found in the batch")
     
     def save_uploaded_files(self, 
                            files, 
@@ -235,32 +378,18 @@ class ImagePreprocessor:
         
         return saved_paths
     
-    def validate_image(self, image_path: str) -> bool:
+    def validate_image(self, image_path: str, strict: bool = False) -> bool:
         """
         Validate if a file is a valid image
         
         Args:
             image_path: Path to the image file
+            strict: Whether to parse the whole file instead of only its header
             
         Returns:
             True if valid, False otherwise
         """
-        valid_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.gif'}
-        
-        try:
-            # Check extension
-            ext = os.path.splitext(image_path)[1].lower()
-            if ext not in valid_extensions:
-                return False
-            
-            # Try to open image
-            img = Image.open(image_path)
-            img.verify()
-            
-            return True
-            
-        except Exception:
-            return False
+        return validate_image_file(image_path, strict)
     
     def get_class_weights(self, train_dir: str) -> dict:
         """
@@ -272,14 +401,15 @@ class ImagePreprocessor:
         Returns:
             Dictionary of class weights
         """
-        from collections import Counter
-        
-        # Count images per class
+        # Count images per class without building file name lists
         class_counts = {}
-        for class_name in os.listdir(train_dir):
-            class_path = os.path.join(train_dir, class_name)
-            if os.path.isdir(class_path):
-                class_counts[class_name] = len(os.listdir(class_path))
+        with os.scandir(train_dir) as class_entries:
+            class_dirs = sorted((entry.name, entry.path) for entry in class_entries if entry.is_dir())
+        
+        # Sorted like the dataset loaders, so weight indices match label indices
+        for class_name, class_path in class_dirs:
+            with os.scandir(class_path) as entries:
+                class_counts[class_name] = sum(1 for entry in entries if entry.is_file())
         
         # Calculate weights
         total = sum(class_counts.values())
@@ -292,6 +422,13 @@ class ImagePreprocessor:
         return class_weights
 
 
+# Below this many files, a thread pool costs more than parallel ingest saves
+PARALLEL_INGEST_MIN_FILES = 16
+
+# Ingest only reads headers and copies files, so a few threads keep the disk busy
+INGEST_WORKERS = 8
+
+
 def preprocess_for_retraining(uploaded_dir: str, 
                               train_dir: str,
                               class_mapping: dict) -> int:
@@ -307,33 +444,24 @@ def preprocess_for_retraining(uploaded_dir: str,
     Returns:
         Number of images processed
     """
-    processed_count = 0
+    # One directory scan instead of an exists() check per mapped file
+    with os.scandir(uploaded_dir) as entries:
+        uploads = [(entry.name, entry.path) for entry in entries
+                   if entry.name in class_mapping and entry.is_file()]
     
-    for filename, class_label in class_mapping.items():
-        src_path = os.path.join(uploaded_dir, filename)
-        
-        if not os.path.exists(src_path):
-            continue
-        
-        # Create class directory if it doesn't exist
-        class_dir = os.path.join(train_dir, class_label)
-        os.makedirs(class_dir, exist_ok=True)
-        
-        # Copy or move file to class directory
-        dst_path = os.path.join(class_dir, filename)
-        
-        try:
-            # Validate image
-            preprocessor = ImagePreprocessor()
-            if preprocessor.validate_image(src_path):
-                import shutil
-                shutil.copy2(src_path, dst_path)
-                processed_count += 1
-        except Exception as e:
-            print(f"Error processing {filename}: {str(e)}")
-            continue
+    # Create class directories up front so workers only validate and copy
+    for class_label in {class_mapping[filename] for filename, _ in uploads}:
+        os.makedirs(os.path.join(train_dir, class_label), exist_ok=True)
+    
+    args = [(src_path, os.path.join(train_dir, class_mapping[filename], filename), filename)
+            for filename, src_path in uploads]
+    
+    if len(args) < PARALLEL_INGEST_MIN_FILES:
+        return sum(map(ingest_one, args))
     
-    return processed_count
+    # Header reads and copyfile release the GIL, so threads overlap the I/O
+    with ThreadPoolExecutor(max_workers=INGEST_WORKERS) as executor:
+        return sum(executor.map(ingest_one, args))
 
 
 if __name__ == "__main__":
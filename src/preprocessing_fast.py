@@ -0,0 +1,56 @@
+"""
+Fused Image Preprocessing Kernels
+
+This module handles:
+- Single-pass uint8 -> float32 conversion, rescaling and batching
+- Numba JIT compilation with a NumPy fallback when Numba is unavailable
+"""
+
+import numpy as np
+from typing import Optional
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    # Single-threaded on purpose: it is called concurrently from request threads,
+    # and Numba's parallel threading layers either abort or oversubscribe then
+    @njit(cache=True)
+    def _fused_rescale(src_u8, out_f32, scale):
+        """Write src_u8 * scale into out_f32[0] reading each pixel once"""
+        height, width, channels = src_u8.shape
+        for i in range(height):
+            for j in range(width):
+                for c in range(channels):
+                    out_f32[0, i, j, c] = src_u8[i, j, c] * scale
+
+
+def rescale_to_batch(src_u8: np.ndarray,
+                     normalize: bool = True,
+                     out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert a decoded HxWx3 uint8 image into a (1, H, W, 3) float32 batch
+
+    Args:
+        src_u8: Decoded image pixels as uint8
+        normalize: Whether to scale pixel values to [0, 1]
+        out: Optional (1, H, W, 3) float32 array to write into, e.g. a slice
+            of a preallocated batch
+
+    Returns:
+        Preprocessed image array ready for prediction
+    """
+    if out is None:
+        out = np.empty((1, *src_u8.shape), dtype=np.float32)
+    scale = np.float32(1.0 / 255.0) if normalize else np.float32(1.0)
+
+    if NUMBA_AVAILABLE:
+        _fused_rescale(np.ascontiguousarray(src_u8), out, scale)
+    else:
+        np.multiply(src_u8, scale, out=out[0], casting='unsafe')
+
+    return out
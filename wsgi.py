@@ -0,0 +1,30 @@
+"""
+WSGI Entry Point for Production Serving
+
+Serves the Flask application with gunicorn. Without --preload each worker
+imports this module after it has forked, so every worker loads its own
+model and TensorFlow runtime (TensorFlow is not fork-safe, so the model must
+never be loaded in the master process).
+
+Usage:
+    WEB_CONCURRENCY=2 gunicorn --threads 4 --timeout 120 wsgi:application
+
+Note:
+    Keep the worker count small and set it through WEB_CONCURRENCY (gunicorn's
+    default for --workers): every worker sizes its TensorFlow, TFLite and
+    decoding threads to cpu_count / WEB_CONCURRENCY, so one worker per core
+    would oversubscribe the CPUs.
+
+    Do not add --preload. Retraining runs in the worker that received the
+    /retrain request: only that worker reloads the new model and reports
+    progress through /api/retrain_status. Restart gunicorn (or send it HUP)
+    after retraining to serve the new model from every worker.
+"""
+
+from app.app import app, initialize_model
+
+# Runs once per worker, after the fork
+if not initialize_model():
+    print("Failed to initialize model. Please train the model first.")
+
+application = app